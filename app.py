@@ -3,6 +3,7 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, JWTManager
 from dotenv import load_dotenv
+from utils.memory_store import InMemoryStore
 
 # Load environment variables from a .env file
 load_dotenv()
@@ -14,12 +15,11 @@ jwt = JWTManager(app)
 CORS(app, resources={r"/api/*": {"origins": ["http://localhost:3000", "http://127.0.0.1:3000"]}})
 
 # --- In-Memory Data Store (No Database) ---
-users = []
-trips = {}
+store = InMemoryStore()
 
 def find_user_by_email(email):
     """Helper function to find a user by email."""
-    return next((user for user in users if user['email'] == email), None)
+    return store.find_user_by_email(email)
 
 # --- API Routes ---
 
@@ -33,13 +33,10 @@ def register():
     if not email or not password:
         return jsonify({"success": False, "message": "Email and password required"}), 400
 
-    if find_user_by_email(email):
-        return jsonify({"success": False, "message": "User already exists"}), 400
-    
     # NOTE: In a real app, you MUST hash passwords.
-    new_user = {"id": len(users) + 1, "email": email, "password": password}
-    users.append(new_user)
-    trips[email] = [] # Initialize trips for the new user
+    # add_user checks for an existing email and allocates the id atomically.
+    if store.add_user(email, password) is None:
+        return jsonify({"success": False, "message": "User already exists"}), 400
 
     return jsonify({"success": True, "message": "User registered successfully"}), 201
 
@@ -66,16 +63,24 @@ def login():
 @app.route("/api/trips/dashboard-overview", methods=["GET"])
 @jwt_required()
 def get_dashboard_overview():
-    """Provides overview stats for the dashboard."""
+    """
+    Provides overview stats for the dashboard.
+
+    user_stats has the same counters as trip_bp's version, but the body is
+    {"welcome", "user_stats"} rather than trip_bp's {"success", "data": {"user_stats"}}.
+    """
     current_user_email = get_jwt_identity()
-    user_trips = trips.get(current_user_email, [])
-    
+    user_trips = store.get_trips(current_user_email)
+    # Trips without a status count as planned, as in utils/trip_stats.py.
+    statuses = [trip.get("status") or "planned" for trip in user_trips]
+
     overview_data = {
         "welcome": "Welcome to your In-Memory Travel Planner!",
         "user_stats": {
-            "total_trips": len(user_trips), 
-            "upcoming_trips": len(user_trips), 
-            "completed_trips": 0
+            "total_trips": len(user_trips),
+            "upcoming_trips": statuses.count("planned"),
+            "active_trips": statuses.count("active"),
+            "completed_trips": statuses.count("completed"),
         }
     }
     return jsonify(overview_data)
@@ -87,13 +92,10 @@ def get_user_trips():
     current_user_email = get_jwt_identity()
     
     # Create mock data for a user on their first fetch.
-    if current_user_email not in trips or not trips[current_user_email]:
-        trips[current_user_email] = [
-            {"id": 1, "title": "Summer in Paris", "destination_city": "Paris", "destination_country": "France"},
-            {"id": 2, "title": "Tokyo Adventure", "destination_city": "Tokyo", "destination_country": "Japan"},
-        ]
-        
-    user_trips = trips.get(current_user_email, [])
+    user_trips = store.set_trips_if_empty(current_user_email, [
+        {"id": 1, "title": "Summer in Paris", "destination_city": "Paris", "destination_country": "France"},
+        {"id": 2, "title": "Tokyo Adventure", "destination_city": "Tokyo", "destination_country": "Japan"},
+    ])
     return jsonify({"success": True, "data": {"trips": user_trips}}), 200
 
 # --- App Runner ---
@@ -0,0 +1,103 @@
+"""
+Bandwidth and server CPU per poll for a client polling /api/trips/ and
+/api/weather/forecast, in three modes:
+
+  plain      no Accept-Encoding, no validators (full body every time)
+  gzip       Accept-Encoding: gzip
+  gzip+etag  gzip, and If-None-Match with the last ETag it received
+
+One trip changes every --change-every polls, so some polls still get a full
+body. Requests go through Flask's test client in this process, so CPU is
+process time for the whole round trip (the test client's own overhead is
+the same in every mode). Geocoding and Open-Meteo are the local stubs.
+
+Run from the project root:
+    python -m benchmarks.bench_conditional_get [--polls 500] [--trips 50]
+"""
+import argparse
+import itertools
+import logging
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.stub_servers import StubServer, create_geocoding_stub, create_open_meteo_stub
+
+MODES = {
+    "plain": {},
+    "gzip": {"Accept-Encoding": "gzip"},
+    "gzip+etag": {"Accept-Encoding": "gzip"},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--polls", type=int, default=500)
+    parser.add_argument("--trips", type=int, default=50)
+    parser.add_argument("--change-every", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    workdir = tempfile.mkdtemp()
+    geocoding = StubServer(create_geocoding_stub(latency=0)).start()
+    open_meteo = StubServer(create_open_meteo_stub(latency=0)).start()
+    os.environ.update({
+        "GOOGLE_MAPS_API_BASE": geocoding.url, "GOOGLE_MAPS_API_KEY": "bench",
+        "OPEN_METEO_URL": f"{open_meteo.url}/v1/forecast", "WEATHER_CACHE_BACKEND": "memory",
+        "GEOCODE_CACHE_PATH": os.path.join(workdir, "geocode.db"),
+    })
+
+    from flask_jwt_extended import create_access_token
+    from benchmarks.loadtest import build_app
+    from models import db, Trip, User
+
+    app = build_app(workdir)
+    with app.app_context():
+        db.session.add(User(id=1, email="bench@example.com", password_hash="x"))
+        start = date.today() + timedelta(days=10)
+        db.session.add_all(
+            Trip(user_id=1, title=f"Trip {i}", destination_city=f"City {i}", destination_country="Benchland",
+                 start_date=start, end_date=start + timedelta(days=4), duration=5)
+            for i in range(args.trips)
+        )
+        db.session.commit()
+        auth = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+
+    endpoints = {
+        "trips": ("/api/trips/?per_page=50", auth),
+        "forecast": ("/api/weather/forecast?city=Paris&format=legacy", {}),
+    }
+    client = app.test_client()
+    for url, headers in endpoints.values():
+        client.get(url, headers=headers)  # warm the geocode and forecast caches
+
+    changes = itertools.count(1)
+    print(f"{'endpoint':<10} {'mode':<10} {'bytes/poll':>11} {'cpu ms/poll':>12} {'304s':>6}")
+    for name, (url, headers) in endpoints.items():
+        for mode, mode_headers in MODES.items():
+            etag, sent, not_modified, cpu = None, 0, 0, 0.0
+            for poll in range(args.polls):
+                if poll % args.change_every == 0:
+                    with app.app_context():
+                        trip = db.session.get(Trip, 1 + poll // args.change_every % args.trips)
+                        trip.title = f"{trip.title.split(' #')[0]} #{next(changes)}"
+                        db.session.commit()
+                request_headers = dict(headers, **mode_headers)
+                if mode == "gzip+etag" and etag:
+                    request_headers["If-None-Match"] = etag
+                began = time.process_time()
+                response = client.get(url, headers=request_headers)
+                cpu += time.process_time() - began
+                sent += len(response.data)
+                not_modified += response.status_code == 304
+                etag = response.headers.get("ETag", etag)
+            print(f"{name:<10} {mode:<10} {sent / args.polls:>11.0f} {1000 * cpu / args.polls:>12.2f} "
+                  f"{not_modified:>6}")
+
+    for stub in (geocoding, open_meteo):
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
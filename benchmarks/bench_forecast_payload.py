@@ -0,0 +1,78 @@
+"""
+Compares the legacy and compact /forecast payloads.
+
+Builds a synthetic 16-day hourly Open-Meteo response and times the conversion
+plus JSON encoding for both formats, with and without a date-range filter.
+
+Run from the project root:
+    python -m benchmarks.bench_forecast_payload
+"""
+import json
+import time
+import timeit
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from weather_routes import _hourly_to_compact, _hourly_to_dict
+
+HOURS = 16 * 24
+REPEAT = 200
+
+
+class _Variable:
+    def __init__(self, values):
+        self._values = values
+
+    def ValuesAsNumpy(self):
+        return self._values
+
+
+class _Hourly:
+    def __init__(self, start, values):
+        self._start = start
+        self._values = values
+
+    def Time(self):
+        return self._start
+
+    def TimeEnd(self):
+        return self._start + 3600 * len(self._values)
+
+    def Interval(self):
+        return 3600
+
+    def Variables(self, index):
+        return _Variable(self._values)
+
+
+class _Response:
+    """Just enough of openmeteo_sdk's WeatherApiResponse for the converters."""
+    def __init__(self):
+        start = int(time.time()) // 3600 * 3600
+        values = (np.random.rand(HOURS) * 30).astype(np.float32)
+        self._hourly = _Hourly(start, values)
+
+    def Hourly(self):
+        return self._hourly
+
+    def UtcOffsetSeconds(self):
+        return 0
+
+
+def main():
+    response = _Response()
+    cases = [("full 16 days", None, 16), ("3-day slice", datetime.utcnow() + timedelta(days=2), 3)]
+
+    print(f"{'case':<14} {'format':<8} {'ms/op':>8} {'bytes':>8}")
+    for name, start_date, duration in cases:
+        for fmt, convert in (("legacy", _hourly_to_dict), ("compact", _hourly_to_compact)):
+            body = json.dumps(convert(response, start_date, duration), default=str)
+            seconds = timeit.timeit(
+                lambda: json.dumps(convert(response, start_date, duration), default=str), number=REPEAT
+            ) / REPEAT
+            print(f"{name:<14} {fmt:<8} {seconds * 1e3:>8.3f} {len(body):>8}")
+
+
+if __name__ == "__main__":
+    main()
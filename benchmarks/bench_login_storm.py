@@ -0,0 +1,108 @@
+"""
+Login-storm load test: how much does a burst of logins hurt other endpoints?
+
+Serves the auth blueprint plus a cheap /api/ping endpoint from a threaded
+server, hammers /api/auth/login from many threads and probes /api/ping at the
+same time. Runs once with hashing inline in request threads and once with the
+bounded process pool, and reports ping tail latency and login outcomes.
+
+Run from the project root:
+    python -m benchmarks.bench_login_storm [--seconds 10] [--clients 32]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import requests
+from flask import Flask, jsonify
+from flask_jwt_extended import JWTManager
+
+from benchmarks.stub_servers import StubServer
+from models import db, User
+from routes.auth_routes import auth_bp
+from utils import password_hasher
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def build_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'storm.db')}"
+    app.config["JWT_SECRET_KEY"] = "bench-secret-key-of-sufficient-length"
+    db.init_app(app)
+    JWTManager(app)
+    app.register_blueprint(auth_bp, url_prefix="/api/auth")
+
+    @app.route("/api/ping")
+    def ping():
+        return jsonify({"users": User.query.count()})
+
+    return app
+
+
+def storm(url, seconds, clients):
+    stop = time.monotonic() + seconds
+    outcomes = Counter()
+    ping_latencies = []
+
+    def login_client():
+        session = requests.Session()
+        while time.monotonic() < stop:
+            r = session.post(f"{url}/api/auth/login", json={"email": "storm@example.com", "password": "hunter2"})
+            outcomes[r.status_code] += 1
+
+    def prober():
+        session = requests.Session()
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            session.get(f"{url}/api/ping")
+            ping_latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_client) for _ in range(clients)]
+    threads.append(threading.Thread(target=prober))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes, ping_latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    app = build_app()
+    with app.app_context():
+        db.create_all()
+        password_hasher.configure(workers=0)
+        user = User(email="storm@example.com")
+        user.set_password("hunter2")
+        db.session.add(user)
+        db.session.commit()
+
+    print(f"{'mode':<8} {'logins/s':>9} {'503s':>6} {'ping p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+    with StubServer(app) as server:
+        for mode, workers in (("inline", 0), ("pool", args.workers)):
+            password_hasher.configure(workers=workers)
+            outcomes, pings = storm(server.url, args.seconds, args.clients)
+            print(f"{mode:<8} {outcomes[200] / args.seconds:>9.1f} {outcomes[503]:>6} "
+                  f"{percentile(pings, 50) * 1e3:>9.1f} {percentile(pings, 95) * 1e3:>9.1f} "
+                  f"{percentile(pings, 99) * 1e3:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
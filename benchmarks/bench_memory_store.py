@@ -0,0 +1,45 @@
+"""
+Microbenchmark for the in-memory user store.
+
+Compares email lookups on the old linear scan against InMemoryStore's hash
+index as the number of users grows up to 1M.
+
+Run from the project root:
+    python -m benchmarks.bench_memory_store
+"""
+import random
+import timeit
+
+from utils.memory_store import InMemoryStore
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+LOOKUPS = 1_000
+SCAN_LOOKUPS = 20  # The linear scan is too slow to run LOOKUPS times at 1M.
+
+
+def linear_find(users, email):
+    return next((user for user in users if user['email'] == email), None)
+
+
+def main():
+    print(f"{'users':>10} {'scan (us/op)':>14} {'store (us/op)':>14}")
+    for size in SIZES:
+        store = InMemoryStore()
+        users = []
+        for i in range(size):
+            users.append(store.add_user(f"user{i}@example.com", "secret"))
+
+        emails = [f"user{random.randrange(size)}@example.com" for _ in range(LOOKUPS)]
+
+        scan = timeit.timeit(
+            lambda: [linear_find(users, e) for e in emails[:SCAN_LOOKUPS]], number=1
+        ) / SCAN_LOOKUPS
+        indexed = timeit.timeit(
+            lambda: [store.find_user_by_email(e) for e in emails], number=1
+        ) / LOOKUPS
+
+        print(f"{size:>10} {scan * 1e6:>14.2f} {indexed * 1e6:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Mixed trip read/write load against one SQLite file from several worker
+processes, like gunicorn workers sharing instance/travel.db.
+
+"default" uses the stock engine options (rollback journal, pysqlite's
+deferred transactions); "profile" uses SQLiteProductionConfig (WAL, tuned
+pragmas, pooled query_only readers, one queued BEGIN IMMEDIATE writer).
+Reports throughput, tail latency and "database is locked" failures.
+
+Run from the project root:
+    python -m benchmarks.bench_sqlite_concurrency [--seconds 10] [--workers 4] [--threads 8] [--write-ratio 0.2]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from datetime import date
+
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+
+from config import Config, SQLiteProductionConfig
+from models import db, Trip, User
+from utils.sqlite_profile import READER_BIND, init_sqlite_profile
+
+USERS = 50
+TRIPS_PER_USER = 40
+PAGE = 20
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def build_app(uri, profile):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = uri
+    if profile:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = SQLiteProductionConfig.SQLALCHEMY_ENGINE_OPTIONS
+        app.config["SQLALCHEMY_BINDS"] = {
+            READER_BIND: dict(SQLiteProductionConfig.SQLALCHEMY_BINDS[READER_BIND], url=uri),
+        }
+    else:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = Config.SQLALCHEMY_ENGINE_OPTIONS
+    db.init_app(app)
+    if profile:
+        init_sqlite_profile(app, db)
+    return app
+
+
+def seed(uri):
+    app = build_app(uri, profile=False)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(User.__table__.insert(), [
+            {"id": u, "email": f"user{u}@example.com", "password_hash": "x"} for u in range(1, USERS + 1)
+        ])
+        db.session.commit()
+        db.session.add_all(
+            Trip(user_id=u, title=f"Trip {u}-{i}", destination_city="Paris", destination_country="France",
+                 start_date=date(2026, 6, 1), end_date=date(2026, 6, 5), duration=5,
+                 budget_amount=1000, budget_currency="EUR")
+            for u in range(1, USERS + 1) for i in range(TRIPS_PER_USER)
+        )
+        db.session.commit()
+
+
+def read_op(rng):
+    rows = (
+        Trip.query.with_entities(*Trip.summary_columns())
+        .filter_by(user_id=rng.randint(1, USERS))
+        .order_by(Trip.created_at.desc(), Trip.id.desc()).limit(PAGE).all()
+    )
+    return [Trip.summary_dict(row) for row in rows]
+
+
+def write_op(rng):
+    user_id = rng.randint(1, USERS)
+    trip = Trip.query.filter_by(user_id=user_id).order_by(Trip.id).first()
+    trip.title = f"Trip {user_id} edited {rng.random():.6f}"
+    if rng.random() < 0.3:
+        db.session.add(Trip(user_id=user_id, title="New trip", destination_city="Rome",
+                            destination_country="Italy", start_date=date(2026, 7, 1),
+                            end_date=date(2026, 7, 3), duration=3))
+    db.session.commit()
+
+
+def worker(uri, profile, seconds, threads, write_ratio, results):
+    import threading
+
+    app = build_app(uri, profile)
+    latencies = {"read": [], "write": []}
+    outcomes = Counter()
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def client(seed_value):
+        rng = random.Random(seed_value)
+        while time.monotonic() < stop:
+            kind = "write" if rng.random() < write_ratio else "read"
+            start = time.perf_counter()
+            with app.app_context():
+                try:
+                    (write_op if kind == "write" else read_op)(rng)
+                    ok = "ok"
+                except OperationalError as e:
+                    db.session.rollback()
+                    ok = "locked" if "locked" in str(e) else "error"
+                finally:
+                    db.session.remove()
+            elapsed = time.perf_counter() - start
+            with lock:
+                outcomes[(kind, ok)] += 1
+                if ok == "ok":
+                    latencies[kind].append(elapsed)
+
+    clients = [threading.Thread(target=client, args=(os.getpid() * 1000 + i,)) for i in range(threads)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    results.put((latencies, outcomes))
+
+
+def run(mode, args):
+    uri = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'concurrency.db')}"
+    seed(uri)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(uri, mode == "profile", args.seconds, args.threads,
+                                                     args.write_ratio, results))
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    latencies = {"read": [], "write": []}
+    outcomes = Counter()
+    for _ in processes:
+        worker_latencies, worker_outcomes = results.get()
+        for kind in latencies:
+            latencies[kind].extend(worker_latencies[kind])
+        outcomes.update(worker_outcomes)
+    for process in processes:
+        process.join()
+
+    for kind in ("read", "write"):
+        values = latencies[kind]
+        print(f"{mode:<8} {kind:<6} {outcomes[(kind, 'ok')] / args.seconds:>8.1f} "
+              f"{percentile(values, 50) * 1e3:>8.1f} {percentile(values, 95) * 1e3:>8.1f} "
+              f"{percentile(values, 99) * 1e3:>8.1f} {outcomes[(kind, 'locked')]:>7} {outcomes[(kind, 'error')]:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--mode", choices=("default", "profile", "both"), default="both")
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'op':<6} {'ops/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'locked':>7} {'errors':>6}")
+    for mode in (("default", "profile") if args.mode == "both" else (args.mode,)):
+        run(mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Wall time to fully enrich a trip (coordinates, weather summary, itinerary):
+the blocking helpers called one after another vs utils.trip_enrichment.
+
+Upstreams are the local stubs from benchmarks/stub_servers.py. Every trip
+gets its own destination so no cache is shared between trips or modes.
+
+Run from the project root:
+    python -m benchmarks.bench_trip_enrichment [--trips 10] [--gemini-latency 0.8]
+"""
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.stub_servers import StubServer, create_gemini_stub, create_geocoding_stub, create_open_meteo_stub
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trips", type=int, default=10)
+    parser.add_argument("--gemini-latency", type=float, default=0.8)
+    parser.add_argument("--geocoding-latency", type=float, default=0.1)
+    parser.add_argument("--open-meteo-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    workdir = tempfile.mkdtemp()
+    gemini = StubServer(create_gemini_stub(latency=args.gemini_latency)).start()
+    geocoding = StubServer(create_geocoding_stub(latency=args.geocoding_latency)).start()
+    open_meteo = StubServer(create_open_meteo_stub(latency=args.open_meteo_latency)).start()
+    os.environ.update({
+        "GEMINI_API_BASE": gemini.url, "GEMINI_API_KEY": "bench",
+        "GOOGLE_MAPS_API_BASE": geocoding.url, "GOOGLE_MAPS_API_KEY": "bench",
+        "OPEN_METEO_URL": f"{open_meteo.url}/v1/forecast", "WEATHER_CACHE_BACKEND": "memory",
+        "GEOCODE_CACHE_PATH": os.path.join(workdir, "geocode.db"),
+        "ITINERARY_CACHE_PATH": os.path.join(workdir, "itinerary.db"),
+    })
+
+    from flask import Flask
+    from models import db, Trip, User
+    from utils.itinerary_ai import ItineraryGenerator
+    from utils.itinerary_jobs import build_generator_inputs
+    from utils.trip_enrichment import trip_enricher
+    from weather_routes import get_coordinates, get_weather_data, stored_summary
+
+    def sequential(trip):
+        lat, lon = get_coordinates(trip.destination_city, trip.destination_country)
+        summary = get_weather_data(lat, lon, trip.start_date, trip.duration, "summary")
+        itinerary = ItineraryGenerator().generate_itinerary(
+            **build_generator_inputs(trip, trip.user), force_refresh=True
+        )
+        trip.latitude, trip.longitude = lat, lon
+        trip.set_weather_data(stored_summary(summary))
+        trip.set_itinerary_data(itinerary)
+        db.session.commit()
+
+    def pipeline(trip):
+        report = trip_enricher.enrich(trip, force=True)
+        failed = {part: r for part, r in report.items() if r["status"] != "ok"}
+        if failed:
+            raise RuntimeError(failed)
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(workdir, 'enrich.db')}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, email="bench@example.com", password_hash="x"))
+        start = date.today() + timedelta(days=2)
+        db.session.add_all(
+            Trip(user_id=1, title=f"Trip {i}", destination_city=f"City {i}", destination_country="Benchland",
+                 start_date=start, end_date=start + timedelta(days=3), duration=4)
+            for i in range(2 * args.trips)
+        )
+        db.session.commit()
+
+        print(f"{'mode':<12} {'mean s':>8} {'min s':>8} {'max s':>8}")
+        for offset, (name, fn) in enumerate((("sequential", sequential), ("pipeline", pipeline))):
+            timings = []
+            for trip_id in range(offset * args.trips + 1, (offset + 1) * args.trips + 1):
+                trip = db.session.get(Trip, trip_id)
+                began = time.perf_counter()
+                fn(trip)
+                timings.append(time.perf_counter() - began)
+            print(f"{name:<12} {statistics.mean(timings):>8.3f} {min(timings):>8.3f} {max(timings):>8.3f}")
+
+    for stub in (gemini, geocoding, open_meteo):
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
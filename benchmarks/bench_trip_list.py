@@ -0,0 +1,95 @@
+"""
+Measures latency and peak memory of one trip-list page (50 trips) when every
+trip carries a large itinerary and weather blob.
+
+"full rows" is the old list query (every column, ORM objects, to_dict);
+"summary" is the current one (summary columns only, Trip.summary_dict).
+
+Run from the project root:
+    python -m benchmarks.bench_trip_list [--itinerary-kb 200]
+"""
+import argparse
+import json
+import os
+import tempfile
+import timeit
+import tracemalloc
+from datetime import date
+
+from flask import Flask
+from sqlalchemy.orm import undefer_group
+
+from models import db, Trip, User
+
+PAGE = 50
+REPEAT = 20
+
+
+def build(itinerary_kb):
+    path = os.path.join(tempfile.mkdtemp(), "list_bench.db")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    db.init_app(app)
+    itinerary = json.dumps({"itinerary_text": "x" * (itinerary_kb * 1024), "model_used": "bench"})
+    weather = json.dumps({"format": "compact", "data": {"temperature_2m": [12.5] * 384}})
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, email="bench@example.com", password_hash="x"))
+        db.session.execute(Trip.__table__.insert(), [{
+            "user_id": 1, "title": f"Trip {i}", "destination_city": "Paris",
+            "destination_country": "France", "start_date": date(2026, 1, 1),
+            "end_date": date(2026, 1, 5), "duration": 5,
+            "itinerary_data": itinerary, "weather_data": weather,
+        } for i in range(PAGE * 4)])
+        db.session.commit()
+    return app
+
+
+def full_rows():
+    trips = (
+        Trip.query.options(undefer_group("blobs")).filter_by(user_id=1)
+        .order_by(Trip.created_at.desc()).limit(PAGE).all()
+    )
+    result = [trip.to_dict(include_detailed=False) for trip in trips]
+    db.session.expunge_all()
+    return result
+
+
+def summary():
+    rows = (
+        Trip.query.with_entities(*Trip.summary_columns()).filter_by(user_id=1)
+        .order_by(Trip.created_at.desc()).limit(PAGE).all()
+    )
+    return [Trip.summary_dict(row) for row in rows]
+
+
+def measure(fn):
+    fn()  # Warm up caches and the connection pool.
+    seconds = timeit.timeit(fn, number=REPEAT) / REPEAT
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--itinerary-kb", type=int, default=200)
+    args = parser.parse_args()
+
+    app = build(args.itinerary_kb)
+    with app.app_context():
+        print(f"{'path':<12} {'ms/page':>9} {'peak KiB':>10}")
+        for name, fn in (("full rows", full_rows), ("summary", summary)):
+            seconds, peak = measure(fn)
+            print(f"{name:<12} {seconds * 1e3:>9.2f} {peak / 1024:>10.0f}")
+
+        trip = Trip.query.options(undefer_group("blobs")).first()
+        first = timeit.timeit(lambda: trip.to_dict(include_detailed=True), number=1)
+        repeat = timeit.timeit(lambda: trip.to_dict(include_detailed=True), number=REPEAT) / REPEAT
+        print(f"\ndetail to_dict: first {first * 1e3:.2f} ms, memoized {repeat * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compares the LIKE and FTS5 paths of the trip search at 100k+ trips.
+
+Builds a throwaway SQLite database where one user owns every trip (the worst
+case for LIKE, which has to scan all of them), then times a few searches
+through utils.trip_search.apply_search with FTS on and off. LIKE matches
+substrings while FTS matches word prefixes, so row counts can differ.
+
+Run from the project root:
+    python -m benchmarks.bench_trip_search [--trips 100000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import timeit
+from datetime import date
+
+from flask import Flask
+
+from models import db, Trip, User
+from utils import trip_search
+
+CITIES = [
+    ("Paris", "France"), ("Tokyo", "Japan"), ("Kyoto", "Japan"), ("Rome", "Italy"),
+    ("Lisbon", "Portugal"), ("Barcelona", "Spain"), ("Reykjavik", "Iceland"), ("Cusco", "Peru"),
+]
+THEMES = ["food", "museums", "hiking", "beaches", "nightlife", "architecture", "family", "wine"]
+TERMS = ["paris", "kyo", "wine hik", "reykjavik beaches"]
+REPEAT = 10
+
+
+def build(trips):
+    path = os.path.join(tempfile.mkdtemp(), "search_bench.db")
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, email="agency@example.com", password_hash="x"))
+        rows = []
+        for i in range(trips):
+            city, country = random.choice(CITIES)
+            rows.append({
+                "user_id": 1,
+                "title": f"{city} {random.choice(THEMES)} and {random.choice(THEMES)}",
+                "destination_city": city,
+                "destination_country": country,
+                "start_date": date(2026, 1, 1),
+                "end_date": date(2026, 1, 5),
+                "duration": 5,
+            })
+        db.session.execute(Trip.__table__.insert(), rows)
+        db.session.commit()
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trips", type=int, default=100_000)
+    args = parser.parse_args()
+
+    app = build(args.trips)
+    with app.app_context():
+        engine_url = db.engine.url
+        print(f"{'term':<20} {'like ms':>9} {'fts ms':>9} {'like rows':>10} {'fts rows':>9}")
+        for term in TERMS:
+            timings, counts = {}, {}
+            for mode in ("like", "fts"):
+                trip_search._available[engine_url] = mode == "fts"
+
+                def search():
+                    query, _ = trip_search.apply_search(Trip.query.filter_by(user_id=1), term, db.session)
+                    return query
+
+                # Time what the trip list does by default: one page, no count.
+                counts[mode] = search().count()
+                timings[mode] = timeit.timeit(
+                    lambda: search().order_by(Trip.id.desc()).limit(50).all(), number=REPEAT
+                ) / REPEAT
+            print(f"{term:<20} {timings['like'] * 1e3:>9.2f} {timings['fts'] * 1e3:>9.2f} "
+                  f"{counts['like']:>10} {counts['fts']:>9}")
+
+
+if __name__ == "__main__":
+    main()
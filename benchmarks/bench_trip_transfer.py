@@ -0,0 +1,105 @@
+"""
+Rows/sec for the NDJSON bulk import and export endpoints (utils/trip_transfer.py).
+
+Writes --rows generated trips to a temporary NDJSON file, streams it to
+POST /api/trips/import, then streams GET /api/trips/export back and counts
+the lines. Peak RSS is reported after each phase: with streaming on both
+sides it should stay flat as --rows grows.
+
+Run from the project root:
+    python -m benchmarks.bench_trip_transfer [--rows 1000000] [--chunk-size 1000]
+"""
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+from datetime import date, timedelta
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_ndjson(path, rows):
+    statuses = ("planned", "active", "completed")
+    start = date(2026, 1, 1)
+    with open(path, "w") as f:
+        for i in range(rows):
+            first = start + timedelta(days=i % 365)
+            f.write(json.dumps({
+                "title": f"Trip {i}",
+                "destination_city": f"City {i % 5000}",
+                "destination_country": "Benchland",
+                "start_date": first.isoformat(),
+                "end_date": (first + timedelta(days=4)).isoformat(),
+                "status": statuses[i % 3],
+                "travel_style": "relaxed",
+                "interests": ["food", "museums"],
+                "budget": {"amount": 500 + i % 1000, "currency": "EUR"},
+                "itinerary": {"itinerary_text": f"Day 1: arrive in City {i % 5000}."},
+            }) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["TRIP_IMPORT_CHUNK_SIZE"] = str(args.chunk_size)
+
+    from flask import Flask
+    from flask_jwt_extended import JWTManager, create_access_token
+    from models import db, User
+    from routes.trip_routes import trip_bp
+    from utils.trip_stats import rebuild_trip_stats
+
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(workdir, 'transfer.db')}",
+        JWT_SECRET_KEY="bench-secret-key-bench-secret-key",
+    )
+    db.init_app(app)
+    JWTManager(app)
+    app.register_blueprint(trip_bp, url_prefix="/api/trips")
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, email="bench@example.com", password_hash="x"))
+        db.session.commit()
+        headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+    client = app.test_client()
+
+    path = os.path.join(workdir, "trips.ndjson")
+    write_ndjson(path, args.rows)
+    size_mb = os.path.getsize(path) / 1024 ** 2
+    print(f"{args.rows} trips, {size_mb:.0f} MB of NDJSON; peak RSS {peak_rss_mb():.0f} MB")
+
+    with open(path, "rb") as body:
+        began = time.perf_counter()
+        response = client.post(
+            "/api/trips/import", input_stream=body, content_length=os.path.getsize(path),
+            content_type="application/x-ndjson", headers=headers,
+        )
+        elapsed = time.perf_counter() - began
+    progress = response.get_json()["data"]["import"]
+    print(f"import  {progress['inserted']:>9} rows {elapsed:>8.1f} s {progress['inserted'] / elapsed:>10.0f} rows/s"
+          f"   peak RSS {peak_rss_mb():.0f} MB")
+
+    began = time.perf_counter()
+    response = client.get("/api/trips/export", headers=headers, buffered=False)
+    exported = sum(chunk.count(b"\n") for chunk in response.response)
+    response.close()
+    elapsed = time.perf_counter() - began
+    print(f"export  {exported:>9} rows {elapsed:>8.1f} s {exported / elapsed:>10.0f} rows/s"
+          f"   peak RSS {peak_rss_mb():.0f} MB")
+
+    with app.app_context():
+        mismatched = rebuild_trip_stats(check_only=True)
+    print("stats consistent" if not mismatched else f"stats out of date for users {mismatched}")
+
+
+if __name__ == "__main__":
+    main()
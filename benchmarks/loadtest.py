@@ -0,0 +1,334 @@
+"""
+Offline load test: the auth, trips and weather blueprints against local stubs.
+
+Starts the Gemini, Geocoding and Open-Meteo stubs (benchmarks/stub_servers.py)
+with the given latency and error rate, points the app at them, seeds a
+temporary SQLite database and drives weighted mixed traffic from concurrent
+clients. Reports throughput and p50/p95/p99 per endpoint.
+
+Save a baseline and diff later runs against it:
+    python -m benchmarks.loadtest --save main
+    python -m benchmarks.loadtest --compare main [--threshold 10] [--fail-on-regression]
+
+Run from the project root. See --help for traffic and stub settings.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+import requests
+
+from benchmarks.stub_servers import (
+    StubServer, create_gemini_stub, create_geocoding_stub, create_open_meteo_stub,
+)
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+CITIES = [
+    ("Paris", "France"), ("Rome", "Italy"), ("Tokyo", "Japan"), ("Lisbon", "Portugal"),
+    ("Kyoto", "Japan"), ("Oslo", "Norway"), ("Lima", "Peru"), ("Cairo", "Egypt"),
+    ("Hanoi", "Vietnam"), ("Quito", "Ecuador"), ("Porto", "Portugal"), ("Seville", "Spain"),
+]
+PASSWORD = "load-test-password"
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+# --- Traffic mix ---
+# Each scenario gets (session, base_url, client, rng) and returns the response.
+
+def login(session, url, client, rng):
+    return session.post(f"{url}/api/auth/login", json={"email": client["email"], "password": PASSWORD})
+
+
+def list_trips(session, url, client, rng):
+    params = {"per_page": 20, "sort_by": rng.choice(("created_at", "start_date", "title"))}
+    return session.get(f"{url}/api/trips/", params=params, headers=client["auth"])
+
+
+def search_trips(session, url, client, rng):
+    return session.get(f"{url}/api/trips/", params={"search": rng.choice(CITIES)[0][:4]}, headers=client["auth"])
+
+
+def trip_detail(session, url, client, rng):
+    return session.get(f"{url}/api/trips/{rng.choice(client['trip_ids'])}", headers=client["auth"])
+
+
+def dashboard(session, url, client, rng):
+    return session.get(f"{url}/api/trips/dashboard-overview", headers=client["auth"])
+
+
+def generate_itinerary(session, url, client, rng):
+    return session.post(f"{url}/api/trips/{rng.choice(client['trip_ids'])}/generate-itinerary",
+                        json={}, headers=client["auth"])
+
+
+def forecast(session, url, client, rng):
+    return session.get(f"{url}/api/weather/forecast", params={"city": rng.choice(CITIES)[0]})
+
+
+def forecast_batch(session, url, client, rng):
+    body = {
+        "cities": [{"city": c, "country": n} for c, n in rng.sample(CITIES, 3)],
+        "trip_ids": rng.sample(client["trip_ids"], min(3, len(client["trip_ids"]))),
+        "format": "summary",
+    }
+    return session.post(f"{url}/api/weather/forecast/batch", json=body, headers=client["auth"])
+
+
+# (endpoint label, weight, scenario)
+SCENARIOS = [
+    ("POST /api/auth/login", 3, login),
+    ("GET /api/trips/", 30, list_trips),
+    ("GET /api/trips/?search", 10, search_trips),
+    ("GET /api/trips/<id>", 20, trip_detail),
+    ("GET /api/trips/dashboard-overview", 12, dashboard),
+    ("POST /api/trips/<id>/generate-itinerary", 3, generate_itinerary),
+    ("GET /api/weather/forecast", 15, forecast),
+    ("POST /api/weather/forecast/batch", 7, forecast_batch),
+]
+
+
+# --- Setup ---
+
+def configure_environment(stubs, workdir):
+    """Points the app's upstream clients at the stubs. Must run before the app modules are imported."""
+    os.environ.update({
+        "GEMINI_API_BASE": stubs["gemini"].url,
+        "GEMINI_API_KEY": "load-test",
+        "GOOGLE_MAPS_API_BASE": stubs["geocoding"].url,
+        "GOOGLE_MAPS_API_KEY": "load-test",
+        "OPEN_METEO_URL": f"{stubs['open-meteo'].url}/v1/forecast",
+        "WEATHER_CACHE_BACKEND": "memory",
+        "GEOCODE_CACHE_PATH": os.path.join(workdir, "geocode_cache.db"),
+        "ITINERARY_CACHE_PATH": os.path.join(workdir, "itinerary_cache.db"),
+    })
+
+
+def build_app(workdir):
+    from flask import Flask
+    from flask_jwt_extended import JWTManager
+
+    from models import db
+    from routes.auth_routes import auth_bp
+    from routes.metrics_routes import metrics_bp
+    from routes.trip_routes import trip_bp
+    from utils.compression import init_compression
+    from utils.metrics import init_metrics
+    from weather_routes import weather_bp
+
+    app = Flask("loadtest")
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    app.config["JWT_SECRET_KEY"] = "load-test-secret-key-of-sufficient-length"
+    db.init_app(app)
+    JWTManager(app)
+    init_metrics(app)
+    init_compression(app)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(auth_bp, url_prefix="/api/auth")
+    app.register_blueprint(trip_bp, url_prefix="/api/trips")
+    app.register_blueprint(weather_bp, url_prefix="/api/weather")
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed(app, users, trips_per_user, rng):
+    """Creates users with trips spread around today; returns [(email, [trip ids])]."""
+    from models import db, Trip, User
+
+    today = date.today()
+    accounts = []
+    with app.app_context():
+        for n in range(users):
+            user = User(email=f"load{n}@example.com")
+            user.set_password(PASSWORD)
+            db.session.add(user)
+            db.session.flush()
+            trips = []
+            for i in range(trips_per_user):
+                city, country = rng.choice(CITIES)
+                start = today + timedelta(days=rng.randint(-30, 60))
+                duration = rng.randint(2, 10)
+                trips.append(Trip(
+                    user_id=user.id, title=f"{city} trip {i}", destination_city=city,
+                    destination_country=country, start_date=start,
+                    end_date=start + timedelta(days=duration - 1), duration=duration,
+                    budget_amount=rng.randint(500, 5000), budget_currency="EUR",
+                ))
+            db.session.add_all(trips)
+            db.session.commit()
+            accounts.append((user.email, [trip.id for trip in trips]))
+    return accounts
+
+
+# --- Run ---
+
+def drive(url, accounts, seconds, clients, rng):
+    weights = [weight for _, weight, _ in SCENARIOS]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    sessions = []
+    for email, trip_ids in accounts:
+        session = requests.Session()
+        token = session.post(f"{url}/api/auth/login", json={"email": email, "password": PASSWORD}).json()["token"]
+        sessions.append({"email": email, "trip_ids": trip_ids, "auth": {"Authorization": f"Bearer {token}"}})
+
+    stop = time.monotonic() + seconds
+
+    def client(index):
+        client_rng = random.Random(rng.random())
+        context = sessions[index % len(sessions)]
+        session = requests.Session()
+        while time.monotonic() < stop:
+            label, _, scenario = client_rng.choices(SCENARIOS, weights)[0]
+            start = time.perf_counter()
+            try:
+                status = scenario(session, url, context, client_rng).status_code
+            except requests.RequestException:
+                status = None
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[label].append(elapsed)
+                if status is None or status >= 400:
+                    errors[label] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        label: {
+            "count": len(latencies[label]),
+            "errors": errors[label],
+            "rps": len(latencies[label]) / seconds,
+            "p50_ms": percentile(latencies[label], 50) * 1e3,
+            "p95_ms": percentile(latencies[label], 95) * 1e3,
+            "p99_ms": percentile(latencies[label], 99) * 1e3,
+        }
+        for label, _, _ in SCENARIOS if latencies[label]
+    }
+
+
+def print_report(results):
+    print(f"{'endpoint':<42} {'count':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    for label, row in results.items():
+        print(f"{label:<42} {row['count']:>6} {row['rps']:>7.1f} {row['p50_ms']:>8.1f} "
+              f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['errors']:>6}")
+    total = sum(row["count"] for row in results.values())
+    print(f"{'total':<42} {total:>6} {sum(row['rps'] for row in results.values()):>7.1f}")
+
+
+def compare(results, baseline, threshold):
+    """Prints per-endpoint changes against a baseline; returns the endpoints that regressed."""
+    print(f"\nvs baseline '{baseline['name']}' ({baseline['created']}), regression threshold {threshold:.0f}%")
+    print(f"{'endpoint':<42} {'req/s':>14} {'p50':>14} {'p95':>14} {'p99':>14}")
+    regressed = []
+    for label, row in results.items():
+        old = baseline["results"].get(label)
+        if not old:
+            print(f"{label:<42} (new endpoint)")
+            continue
+        cells, worse = [], False
+        for key, higher_is_better in (("rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False)):
+            change = (row[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            bad = -change if higher_is_better else change
+            # Tail percentiles are noisy on short runs; only p95 and throughput gate.
+            if key in ("rps", "p95_ms") and bad > threshold:
+                worse = True
+            cells.append(f"{change:>+7.1f}%{' !' if bad > threshold else '  '}")
+        print(f"{label:<42} " + " ".join(f"{cell:>14}" for cell in cells))
+        if worse:
+            regressed.append(label)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline mixed-traffic load test against local upstream stubs.")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--trips-per-user", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    parser.add_argument("--geocoding-latency", type=float, default=0.05)
+    parser.add_argument("--open-meteo-latency", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Failure rate of every stub.")
+    parser.add_argument("--save", metavar="NAME", help="Save the results as a baseline.")
+    parser.add_argument("--compare", metavar="NAME", help="Diff the results against a saved baseline.")
+    parser.add_argument("--threshold", type=float, default=10, help="Regression threshold in percent.")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--baseline-dir", default=BASELINE_DIR)
+    args = parser.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    stubs = {
+        "gemini": StubServer(create_gemini_stub(latency=args.gemini_latency, error_rate=args.error_rate)),
+        "geocoding": StubServer(create_geocoding_stub(latency=args.geocoding_latency, error_rate=args.error_rate)),
+        "open-meteo": StubServer(create_open_meteo_stub(latency=args.open_meteo_latency, error_rate=args.error_rate)),
+    }
+    for stub in stubs.values():
+        stub.start()
+    configure_environment(stubs, workdir)
+
+    try:
+        app = build_app(workdir)
+        accounts = seed(app, args.users, args.trips_per_user, rng)
+        with StubServer(app) as server:
+            results = drive(server.url, accounts, args.seconds, args.clients, rng)
+    finally:
+        for stub in stubs.values():
+            stub.stop()
+
+    print_report(results)
+    settings = {key: value for key, value in vars(args).items()
+                if key not in ("save", "compare", "threshold", "fail_on_regression", "baseline_dir")}
+
+    regressed = []
+    if args.compare:
+        with open(os.path.join(args.baseline_dir, f"{args.compare}.json")) as f:
+            baseline = json.load(f)
+        if baseline["settings"] != settings:
+            print("\nwarning: baseline was recorded with different settings:", baseline["settings"])
+        regressed = compare(results, baseline, args.threshold)
+
+    if args.save:
+        os.makedirs(args.baseline_dir, exist_ok=True)
+        path = os.path.join(args.baseline_dir, f"{args.save}.json")
+        with open(path, "w") as f:
+            json.dump({
+                "name": args.save,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "host": {"python": platform.python_version(), "machine": platform.machine(),
+                         "cpus": os.cpu_count()},
+                "settings": settings,
+                "results": results,
+            }, f, indent=2)
+        print(f"\nsaved baseline to {path}")
+
+    if regressed and args.fail_on_regression:
+        print(f"\nregressed: {', '.join(regressed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
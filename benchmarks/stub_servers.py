@@ -0,0 +1,234 @@
+"""
+Local stand-ins for the external APIs the app calls, for offline testing.
+
+Point the app at a stub with the matching environment variable:
+    GEMINI_API_BASE=http://127.0.0.1:8081
+    GOOGLE_MAPS_API_BASE=http://127.0.0.1:8082
+    OPEN_METEO_URL=http://127.0.0.1:8083/v1/forecast
+
+Run a stub from the project root:
+    python -m benchmarks.stub_servers gemini --port 8081 --latency 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+
+import flatbuffers
+import numpy as np
+from flask import Flask, Response, abort, jsonify, request
+from openmeteo_sdk.Unit import Unit
+from openmeteo_sdk.Variable import Variable
+from werkzeug.serving import make_server
+
+SAMPLE_ITINERARY = "\n\n".join(
+    f"**Day {day}: Exploring**\n"
+    f"Morning: Walk the old town and stop for coffee at a local cafe.\n"
+    f"Afternoon: Visit the main museum; book tickets online to skip the queue.\n"
+    f"Evening: Dinner in the market district. Tip: reservations fill up early."
+    for day in range(1, 6)
+)
+
+
+def create_gemini_stub(latency=0.0, chunk_delay=0.02, error_rate=0.0, text=SAMPLE_ITINERARY):
+    """
+    Gemini generateContent / streamGenerateContent stub.
+
+    `latency` is the delay before the first byte, `chunk_delay` the gap
+    between streamed chunks, and `error_rate` the fraction of requests that
+    fail with a 500.
+    """
+    app = Flask("gemini_stub")
+    words = text.split(" ")
+    chunks = [" ".join(words[i:i + 8]) + (" " if i + 8 < len(words) else "") for i in range(0, len(words), 8)]
+
+    def _candidate(part):
+        return {"candidates": [{"content": {"parts": [{"text": part}], "role": "model"}}]}
+
+    @app.route("/v1beta/models/<path:action>", methods=["POST"])
+    def models(action):
+        if random.random() < error_rate:
+            abort(500)
+        time.sleep(latency)
+
+        if action.endswith(":generateContent"):
+            return jsonify(_candidate(text))
+        if not action.endswith(":streamGenerateContent"):
+            abort(404)
+
+        def stream():
+            for i, chunk in enumerate(chunks):
+                if i:
+                    time.sleep(chunk_delay)
+                yield f"data: {json.dumps(_candidate(chunk))}\r\n\r\n"
+
+        if request.args.get("alt") == "sse":
+            return Response(stream(), mimetype="text/event-stream")
+        return jsonify([_candidate(chunk) for chunk in chunks])
+
+    return app
+
+
+def _place_coordinates(address):
+    """Stable fake coordinates for an address, spread over the inhabited latitudes."""
+    digest = zlib.crc32(address.strip().lower().encode())
+    return round(-50 + (digest % 10000) / 100, 4), round(-180 + (digest // 10000 % 36000) / 100, 4)
+
+
+def create_geocoding_stub(latency=0.0, error_rate=0.0):
+    """
+    Google Geocoding API stub.
+
+    Every address resolves to stable made-up coordinates, except addresses
+    containing "nowhere", which return ZERO_RESULTS. `error_rate` requests
+    fail with OVER_QUERY_LIMIT.
+    """
+    app = Flask("geocoding_stub")
+
+    @app.route("/maps/api/geocode/json")
+    def geocode():
+        time.sleep(latency)
+        if random.random() < error_rate:
+            return jsonify({"status": "OVER_QUERY_LIMIT", "results": []})
+        address = request.args.get("address", "")
+        if not address or "nowhere" in address.lower():
+            return jsonify({"status": "ZERO_RESULTS", "results": []})
+        lat, lng = _place_coordinates(address)
+        return jsonify({"status": "OK", "results": [
+            {"formatted_address": address, "geometry": {"location": {"lat": lat, "lng": lng}}},
+        ]})
+
+    return app
+
+
+# Open-Meteo hourly variable name -> (flatbuffers Variable, Unit, value generator).
+_OPEN_METEO_VARIABLES = {
+    "temperature_2m": (Variable.temperature, Unit.celsius,
+                       lambda hours, lat: 25 - abs(lat) / 3 + 6 * np.sin(2 * np.pi * (hours - 9) / 24)),
+    "precipitation": (Variable.precipitation, Unit.millimetre,
+                      lambda hours, lat: np.clip(np.sin(hours / 7.0) * 2, 0, None)),
+    "wind_speed_10m": (Variable.wind_speed, Unit.kilometres_per_hour,
+                       lambda hours, lat: 12 + 8 * np.abs(np.sin(hours / 5.0))),
+}
+
+
+def _encode_forecast(lat, lon, variables, start, hours, utc_offset):
+    """Builds one size-prefixed WeatherApiResponse flatbuffer, as openmeteo_requests expects."""
+    builder = flatbuffers.Builder(1024 + hours * 4 * len(variables))
+    offsets = []
+    steps = np.arange(hours, dtype=np.float64) + (start + utc_offset) // 3600
+    for name in variables:
+        variable, unit, generate = _OPEN_METEO_VARIABLES.get(
+            name, (Variable.undefined, Unit.undefined, lambda hours, lat: np.zeros_like(hours))
+        )
+        values = builder.CreateNumpyVector(np.round(generate(steps, lat), 1).astype(np.float32))
+        builder.StartObject(4)  # VariableWithValues
+        builder.PrependUint8Slot(0, variable, 0)
+        builder.PrependUint8Slot(1, unit, 0)
+        builder.PrependUOffsetTRelativeSlot(3, values, 0)
+        offsets.append(builder.EndObject())
+
+    builder.StartVector(4, len(offsets), 4)
+    for offset in reversed(offsets):
+        builder.PrependUOffsetTRelative(offset)
+    variable_vector = builder.EndVector()
+
+    builder.StartObject(4)  # VariablesWithTime
+    builder.PrependInt64Slot(0, start, 0)
+    builder.PrependInt64Slot(1, start + hours * 3600, 0)
+    builder.PrependInt32Slot(2, 3600, 0)
+    builder.PrependUOffsetTRelativeSlot(3, variable_vector, 0)
+    hourly = builder.EndObject()
+
+    builder.StartObject(15)  # WeatherApiResponse
+    builder.PrependFloat32Slot(0, lat, 0.0)
+    builder.PrependFloat32Slot(1, lon, 0.0)
+    builder.PrependInt32Slot(6, utc_offset, 0)
+    builder.PrependUOffsetTRelativeSlot(11, hourly, 0)
+    builder.FinishSizePrefixed(builder.EndObject())
+    return bytes(builder.Output())
+
+
+def _float_list(name):
+    return [float(value) for item in request.args.getlist(name) for value in item.split(",") if value]
+
+
+def create_open_meteo_stub(latency=0.0, error_rate=0.0):
+    """
+    Open-Meteo forecast API stub speaking the flatbuffers format.
+
+    Returns smooth synthetic hourly series for the requested locations and
+    variables, starting at today's UTC midnight. With timezone=auto the UTC
+    offset is derived from the longitude. `error_rate` requests fail with a 500.
+    """
+    app = Flask("open_meteo_stub")
+
+    @app.route("/v1/forecast")
+    def forecast():
+        time.sleep(latency)
+        if random.random() < error_rate:
+            abort(500)
+        lats, lons = _float_list("latitude"), _float_list("longitude")
+        if not lats or len(lats) != len(lons):
+            return jsonify({"error": True, "reason": "latitude and longitude must have the same length"}), 400
+        variables = [v for item in request.args.getlist("hourly") for v in item.split(",") if v]
+        hours = int(request.args.get("forecast_days", 7)) * 24
+        start = int(time.time()) // 86400 * 86400
+        auto_tz = request.args.get("timezone") == "auto"
+        body = b"".join(
+            _encode_forecast(lat, lon, variables, start, hours, round(lon / 15) * 3600 if auto_tz else 0)
+            for lat, lon in zip(lats, lons)
+        )
+        return Response(body, mimetype="application/octet-stream")
+
+    return app
+
+
+class StubServer:
+    """Runs a stub app on a background thread; usable as a context manager."""
+    def __init__(self, app, host="127.0.0.1", port=0):
+        self._server = make_server(host, port, app, threaded=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://{self._server.host}:{self._server.port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+STUBS = {
+    "gemini": create_gemini_stub,
+    "geocoding": create_geocoding_stub,
+    "open-meteo": create_open_meteo_stub,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("stub", choices=sorted(STUBS))
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    app = STUBS[args.stub](latency=args.latency, error_rate=args.error_rate)
+    print(f"{args.stub} stub listening on http://127.0.0.1:{args.port}")
+    app.run(host="127.0.0.1", port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import os
 from datetime import timedelta
 
+from utils.sqlite_profile import READER_BIND, reader_engine_options, writer_engine_options
+
 class Config:
     
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
@@ -42,4 +44,15 @@ class Config:
     
     DEFAULT_AI_MODEL = 'gpt-3.5-turbo'
     MAX_ITINERARY_DAYS = 30
-    MIN_ITINERARY_DAYS = 1
\ No newline at end of file
+    MIN_ITINERARY_DAYS = 1
+
+
+class SQLiteProductionConfig(Config):
+    """Several workers on one SQLite file: WAL, pooled readers, a single queued writer.
+
+    Call utils.sqlite_profile.init_sqlite_profile(app, db) after db.init_app(app).
+    """
+    SQLALCHEMY_ENGINE_OPTIONS = writer_engine_options()
+    SQLALCHEMY_BINDS = {
+        READER_BIND: {"url": Config.SQLALCHEMY_DATABASE_URI, **reader_engine_options()},
+    }
@@ -1,10 +1,12 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm.attributes import set_committed_value
+from utils.password_hasher import hash_password, verify_password, needs_rehash
+from utils.sqlite_profile import RoutingSession
 import json
 
 # Initialize the SQLAlchemy object. It will be linked to the app in app.py.
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 class User(db.Model):
     __tablename__ = "users"
@@ -23,15 +25,28 @@ class User(db.Model):
 
     trips = db.relationship("Trip", backref="user", lazy=True, cascade="all, delete-orphan")
 
+    # Hashing runs in a bounded process pool and may raise HasherBusyError under load.
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def rehash_password_if_needed(self, password):
+        """Re-hashes a just-verified password if the hash parameters have changed. Caller commits."""
+        if needs_rehash(self.password_hash):
+            self.set_password(password)
+            return True
+        return False
 
     def update_last_login(self):
-        self.last_login = datetime.utcnow()
-        db.session.commit()
+        """Queues the login time for the batched writer instead of committing per login."""
+        from utils.last_login_buffer import last_login_buffer
+
+        now = datetime.utcnow()
+        # Update the loaded object without marking it dirty, so no commit writes it.
+        set_committed_value(self, "last_login", now)
+        last_login_buffer.record(self.id, now)
 
     def get_preferred_activities(self):
         return json.loads(self.preferred_activities) if self.preferred_activities else []
@@ -50,6 +65,15 @@ class User(db.Model):
 
 class Trip(db.Model):
     __tablename__ = "trips"
+    __table_args__ = (
+        # Serve the trip list (filter by user/status, keyset on sort column + id) from indexes.
+        db.Index("ix_trips_user_status_created", "user_id", "status", "created_at", "id"),
+        db.Index("ix_trips_user_created", "user_id", "created_at", "id"),
+        db.Index("ix_trips_user_updated", "user_id", "updated_at", "id"),
+        db.Index("ix_trips_user_start", "user_id", "start_date", "id"),
+        db.Index("ix_trips_user_end", "user_id", "end_date", "id"),
+        db.Index("ix_trips_user_title", "user_id", "title", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -72,8 +96,9 @@ class Trip(db.Model):
     budget_amount = db.Column(db.Float, nullable=True)
     budget_currency = db.Column(db.String(10), default='USD')
 
-    itinerary_data = db.Column(db.Text, nullable=True) # Stored as JSON string
-    weather_data = db.Column(db.Text, nullable=True) # Stored as JSON string
+    # Potentially large JSON blobs: only loaded when first accessed (or via undefer_group("blobs")).
+    itinerary_data = db.deferred(db.Column(db.Text, nullable=True), group="blobs") # Stored as JSON string
+    weather_data = db.deferred(db.Column(db.Text, nullable=True), group="blobs") # Stored as JSON string
 
     ai_generated = db.Column(db.Boolean, default=False)
     generation_model = db.Column(db.String(50), nullable=True)
@@ -81,28 +106,61 @@ class Trip(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Columns needed by to_dict(include_detailed=False), plus every sortable column;
+    # list queries select only these.
+    SUMMARY_COLUMNS = (
+        "id", "user_id", "title", "destination_city", "destination_country",
+        "start_date", "end_date", "duration", "status", "created_at", "updated_at",
+    )
+
+    def _parsed_json(self, name):
+        """json.loads a JSON column once per distinct stored value."""
+        raw = getattr(self, name)
+        if not raw:
+            return None
+        cache = self.__dict__.setdefault("_json_cache", {})
+        cached = cache.get(name)
+        if cached is None or cached[0] is not raw:
+            cached = cache[name] = (raw, json.loads(raw))
+        return cached[1]
+
     def get_interests(self):
-        return json.loads(self.interests) if self.interests else []
+        return self._parsed_json("interests") or []
+
+    def get_itinerary_data(self):
+        return self._parsed_json("itinerary_data")
+
+    def get_weather_data(self):
+        return self._parsed_json("weather_data")
 
     def set_itinerary_data(self, data):
         self.itinerary_data = json.dumps(data)
 
     def set_weather_data(self, data):
         self.weather_data = json.dumps(data)
+
+    @classmethod
+    def summary_columns(cls):
+        return [getattr(cls, name) for name in cls.SUMMARY_COLUMNS]
+
+    @staticmethod
+    def summary_dict(row):
+        """Serializes a Trip, or a row selected with summary_columns(), for list views."""
+        return {
+            "id": row.id,
+            "user_id": row.user_id,
+            "title": row.title,
+            "destination_city": row.destination_city,
+            "destination_country": row.destination_country,
+            "start_date": row.start_date.isoformat(),
+            "end_date": row.end_date.isoformat(),
+            "duration": row.duration,
+            "status": row.status,
+            "created_at": row.created_at.isoformat()
+        }
         
     def to_dict(self, include_detailed=False):
-        data = {
-            "id": self.id,
-            "user_id": self.user_id,
-            "title": self.title,
-            "destination_city": self.destination_city,
-            "destination_country": self.destination_country,
-            "start_date": self.start_date.isoformat(),
-            "end_date": self.end_date.isoformat(),
-            "duration": self.duration,
-            "status": self.status,
-            "created_at": self.created_at.isoformat()
-        }
+        data = Trip.summary_dict(self)
         if include_detailed:
             data.update({
                 "latitude": self.latitude,
@@ -110,9 +168,95 @@ class Trip(db.Model):
                 "travel_style": self.travel_style,
                 "interests": self.get_interests(),
                 "budget": {"amount": self.budget_amount, "currency": self.budget_currency},
-                "itinerary": json.loads(self.itinerary_data) if self.itinerary_data else None,
-                "weather": json.loads(self.weather_data) if self.weather_data else None,
+                "itinerary": self.get_itinerary_data(),
+                "weather": self.get_weather_data(),
                 "ai_generated": self.ai_generated,
                 "generation_model": self.generation_model
             })
         return data
+
+class ItineraryJob(db.Model):
+    __tablename__ = "itinerary_jobs"
+    __table_args__ = (
+        # At most one queued/running job per trip, even across worker processes.
+        db.Index(
+            "uq_itinerary_jobs_active_trip", "trip_id", unique=True,
+            sqlite_where=db.text("status IN ('queued', 'running')"),
+            postgresql_where=db.text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    id = db.Column(db.String(32), primary_key=True) # uuid4 hex
+    trip_id = db.Column(db.Integer, db.ForeignKey("trips.id"), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+
+    status = db.Column(db.String(20), nullable=False, default='queued') # queued, running, succeeded, failed
+    error = db.Column(db.Text, nullable=True)
+    result = db.Column(db.Text, nullable=True) # Stored as JSON string
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "trip_id": self.trip_id,
+            "status": self.status,
+            "error": self.error,
+            "result": json.loads(self.result) if self.result else None,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class TripImport(db.Model):
+    __tablename__ = "trip_imports"
+
+    # Progress of a bulk NDJSON import (utils/trip_transfer.py), advanced in the same commit as each chunk.
+    id = db.Column(db.String(32), primary_key=True) # client-chosen or uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+
+    status = db.Column(db.String(20), nullable=False, default='running') # running, completed
+    lines_done = db.Column(db.Integer, nullable=False, default=0) # body lines 1..N are committed
+    inserted = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "lines_done": self.lines_done,
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+class UserTripStats(db.Model):
+    __tablename__ = "user_trip_stats"
+
+    # Maintained incrementally by utils/trip_stats.py whenever trips change.
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    total_trips = db.Column(db.Integer, nullable=False, default=0)
+    upcoming_trips = db.Column(db.Integer, nullable=False, default=0) # status 'planned'
+    active_trips = db.Column(db.Integer, nullable=False, default=0)
+    completed_trips = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "total_trips": self.total_trips,
+            "upcoming_trips": self.upcoming_trips,
+            "active_trips": self.active_trips,
+            "completed_trips": self.completed_trips,
+        }
+
+class UserBudgetTotal(db.Model):
+    __tablename__ = "user_budget_totals"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    currency = db.Column(db.String(10), primary_key=True)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
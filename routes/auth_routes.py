@@ -1,9 +1,16 @@
 from flask import Blueprint, request, jsonify
 from models import db, User
 from flask_jwt_extended import create_access_token
+from utils.password_hasher import HasherBusyError
 
 auth_bp = Blueprint('auth', __name__)
 
+def _busy(error):
+    """Load shedding: the password hasher is saturated, so fail fast."""
+    response = jsonify({"success": False, "message": str(error)})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -17,7 +24,10 @@ def register():
         username=data.get("username"),
         email=data["email"]
     )
-    new_user.set_password(data["password"])  # ✅ hashes the password
+    try:
+        new_user.set_password(data["password"])  # ✅ hashes the password
+    except HasherBusyError as e:
+        return _busy(e)
     db.session.add(new_user)
     db.session.commit()
 
@@ -29,9 +39,18 @@ def login():
     data = request.get_json()
     user = User.query.filter_by(email=data.get("email")).first()
 
-    if not user or not user.check_password(data.get("password")):
-        return jsonify({"success": False, "message": "Invalid credentials"}), 401
+    try:
+        if not user or not user.check_password(data.get("password")):
+            return jsonify({"success": False, "message": "Invalid credentials"}), 401
+    except HasherBusyError as e:
+        return _busy(e)
+    try:
+        if user.rehash_password_if_needed(data["password"]):
+            db.session.commit()
+    except HasherBusyError:
+        pass  # Upgrading the hash is opportunistic; the password is verified, so try again next login.
 
     user.update_last_login()  # ✅ update last_login field
-    access_token = create_access_token(identity=user.id)
+    # PyJWT 2.10+ rejects tokens whose "sub" claim is not a string.
+    access_token = create_access_token(identity=str(user.id))
     return jsonify({"success": True, "token": access_token, "user": user.to_dict()}), 200
@@ -0,0 +1,18 @@
+import os
+
+from flask import Blueprint, Response, abort, request
+
+from utils.metrics import render
+
+metrics_bp = Blueprint("metrics", __name__)
+
+# When set, scrapers must send "Authorization: Bearer <token>".
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus scrape endpoint; see utils/metrics.py for what is recorded."""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        abort(401)
+    return Response(render(), mimetype="text/plain; version=0.0.4")
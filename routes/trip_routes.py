@@ -1,21 +1,56 @@
-from flask import Blueprint, request, jsonify
+import json
+import click
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func, select
+from sqlalchemy.orm import undefer_group
 # *** FIXED ***: Removed 'TravelTip' as it's not defined in the new models.py and wasn't being used in this file.
-from models import db, User, Trip 
-# from utils.itinerary_ai import ItineraryGenerator # This line was causing an error if the file doesn't exist.
+from models import db, User, Trip, ItineraryJob, TripImport
+from utils.itinerary_ai import ItineraryGenerator, iter_days
+from utils.itinerary_cache import itinerary_cache
+from utils.http_cache import add_validators, is_not_modified, make_etag, not_modified
+from utils.itinerary_jobs import itinerary_jobs, QueueFullError, build_generator_inputs
+from utils.pagination import keyset_page
+from utils.trip_enrichment import PARTS as ENRICH_PARTS, trip_enricher
+from utils.trip_search import apply_search, enable_trip_search
+from utils.trip_stats import get_user_stats, rebuild_trip_stats, sweep_trip_statuses
+from utils.trip_transfer import TRIP_IMPORT_MAX_BYTES, ImportConflict, export_trips, import_trips, read_lines
+from utils.user_cache import current_user_snapshot
 # from routes.weather_routes import get_coordinates, get_weather as get_weather_data # This also causes circular import issues.
 
 trip_bp = Blueprint("trips", __name__)
-# ai_generator = ItineraryGenerator() # This should be initialized where it's used or passed in.
+# Any app serving these routes runs the job queue, including restart recovery.
+trip_bp.record_once(lambda state: itinerary_jobs.init_app(state.app))
+
+# Columns the trip list may be sorted by; each has a (user_id, column, id) index on Trip.
+SORTABLE_COLUMNS = ("created_at", "updated_at", "start_date", "end_date", "title")
 
 @trip_bp.route("/", methods=["GET"])
 @jwt_required()
 def get_user_trips():
     """
     Fetches a paginated and filterable list of trips for the logged-in user.
+
+    Pages are addressed by the opaque `cursor` from the previous response.
+    Pass include_total=1 for an exact total_items count. `search` matches
+    word prefixes in the title, destination and itinerary text using SQLite
+    FTS5 where available, falling back to LIKE on title and destination.
+
+    Responses carry a weak ETag over the user's trip count, newest
+    updated_at and highest id plus the query string; polling with
+    If-None-Match gets a 304 without the list being queried. (Last-Modified
+    is informational only: it can't reflect a deleted trip.)
     """
     try:
         user_id = get_jwt_identity()
+
+        # One index-only aggregate; any insert, update or delete of the user's trips changes it.
+        fingerprint = db.session.execute(
+            select(func.count(), func.max(Trip.updated_at), func.max(Trip.id)).where(Trip.user_id == user_id)
+        ).one()
+        etag = make_etag("trips", user_id, *fingerprint, sorted(request.args.items(multi=True)))
+        if is_not_modified(etag):
+            return not_modified(etag, fingerprint[1], "private, no-cache")
         
         # Basic query for the user's trips
         query = Trip.query.filter_by(user_id=user_id)
@@ -25,55 +60,288 @@ def get_user_trips():
         if status:
             query = query.filter_by(status=status)
 
+        rank = None
         search = request.args.get("search")
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                (Trip.title.like(search_term)) |
-                (Trip.destination_city.like(search_term)) |
-                (Trip.destination_country.like(search_term))
-            )
+            query, rank = apply_search(query, search, db.session)
         
         # --- Sorting ---
-        sort_by = request.args.get("sort_by", "created_at")
-        sort_order = request.args.get("sort_order", "desc")
-        if hasattr(Trip, sort_by):
+        # Full-text searches default to relevance order (best match first).
+        sort_by = request.args.get("sort_by", "relevance" if rank is not None else "created_at")
+        sort_order = request.args.get("sort_order", "asc" if sort_by == "relevance" else "desc")
+        # Select only the summary columns: no ORM objects and no JSON blobs per row.
+        query = query.with_entities(*Trip.summary_columns())
+        row_key = None
+        if sort_by == "relevance" and rank is not None:
+            # bm25 rank: lower is more relevant.
+            order_field, sort_order = rank, "asc"
+            query = query.add_columns(rank)
+            row_key = lambda row: (row.rank, row.id)
+        elif sort_by in SORTABLE_COLUMNS and sort_order in ("asc", "desc"):
             order_field = getattr(Trip, sort_by)
-            query = query.order_by(order_field.desc() if sort_order == "desc" else order_field.asc())
+        else:
+            return jsonify({
+                "success": False,
+                "message": f"sort_by must be one of {', '.join(SORTABLE_COLUMNS)} (or relevance when searching) "
+                           f"and sort_order asc or desc",
+            }), 400
 
         # --- Pagination ---
-        page = request.args.get("page", 1, type=int)
-        per_page = min(request.args.get("per_page", 10, type=int), 50) # Limit per_page to a max of 50
-        
-        trips_paginated = query.paginate(page=page, per_page=per_page, error_out=False)
-        trips_data = [trip.to_dict(include_detailed=False) for trip in trips_paginated.items]
+        # Keyset pagination: pass the returned next_cursor to get the following page.
+        per_page = max(1, min(request.args.get("per_page", 10, type=int), 50)) # Keep per_page within 1-50
+        cursor = request.args.get("cursor")
+        include_total = request.args.get("include_total", "0").lower() in ("1", "true")
+
+        # Counting is a full scan of the user's matching trips, so it is opt-in.
+        total_items = query.order_by(None).count() if include_total else None
 
-        return jsonify({
+        try:
+            trips, next_cursor = keyset_page(
+                query, order_field, Trip.id, sort_by, sort_order, per_page, cursor, row_key
+            )
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        trips_data = [Trip.summary_dict(row) for row in trips]
+
+        response = jsonify({
             "success": True,
             "data": {
                 "trips": trips_data,
                 "pagination": {
-                    "page": page,
                     "per_page": per_page,
-                    "total_items": trips_paginated.total,
-                    "total_pages": trips_paginated.pages,
+                    "next_cursor": next_cursor,
+                    "has_more": next_cursor is not None,
+                    "total_items": total_items,
                 },
             },
-        }), 200
+        })
+        return add_validators(response, etag, fingerprint[1], "private, no-cache"), 200
 
-    except Exception as e:
-        # It's good practice to log the actual error for debugging
-        print(f"Error fetching trips: {e}") 
+    except Exception:
+        current_app.logger.exception("Error fetching trips")
         return jsonify({"success": False, "message": "An error occurred while fetching trips."}), 500
 
 
-# NOTE: The '/generate-itinerary' route has been commented out as it depends on 
-# 'itinerary_ai.py' and 'weather_routes.py', which were causing import errors.
-# We can add this back once the main application is running smoothly.
-#
-# @trip_bp.route("/<int:trip_id>/generate-itinerary", methods=["POST"])
-# @jwt_required()
-# def generate_itinerary(trip_id):
-#     # ... implementation ...
-#     pass
+@trip_bp.route("/dashboard-overview", methods=["GET"])
+@jwt_required()
+def get_dashboard_overview():
+    """Overview stats for the dashboard, read from the incrementally maintained stats tables."""
+    return jsonify({"success": True, "data": {"user_stats": get_user_stats(get_jwt_identity())}}), 200
+
+
+@trip_bp.route("/<int:trip_id>", methods=["GET"])
+@jwt_required()
+def get_trip(trip_id):
+    """Returns one trip with its itinerary and stored weather."""
+    trip = (
+        Trip.query.options(undefer_group("blobs"))
+        .filter_by(id=trip_id, user_id=get_jwt_identity())
+        .first()
+    )
+    if not trip:
+        return jsonify({"success": False, "message": "Trip not found"}), 404
+    return jsonify({"success": True, "data": {"trip": trip.to_dict(include_detailed=True)}}), 200
+
+
+@trip_bp.route("/<int:trip_id>/generate-itinerary", methods=["POST"])
+@jwt_required()
+def generate_itinerary(trip_id):
+    """
+    Queues AI itinerary generation for a trip and returns the job immediately.
+
+    Poll GET /itinerary-jobs/<job_id> for the result. Submitting again while a
+    job for the trip is still queued or running returns that job. Send
+    {"force": true} to regenerate instead of reusing a cached itinerary.
+    """
+    trip = Trip.query.filter_by(id=trip_id, user_id=get_jwt_identity()).first()
+    if not trip:
+        return jsonify({"success": False, "message": "Trip not found"}), 404
+
+    try:
+        force = bool((request.get_json(silent=True) or {}).get("force"))
+        job, created = itinerary_jobs.submit(trip, force_refresh=force)
+    except QueueFullError as e:
+        return jsonify({"success": False, "message": str(e)}), 503
+
+    return jsonify({"success": True, "data": {"job": job.to_dict(), "created": created}}), 202
+
+
+@trip_bp.route("/<int:trip_id>/enrich", methods=["POST"])
+@jwt_required()
+def enrich_trip(trip_id):
+    """
+    Fills in the trip's coordinates, weather summary and itinerary in one call.
+
+    The upstream calls run concurrently; a part that fails or times out is
+    reported in data.parts and the others are still saved. Body (optional):
+    {"parts": ["coordinates", "weather", "itinerary"], "force": false}.
+    """
+    trip = Trip.query.filter_by(id=trip_id, user_id=get_jwt_identity()).first()
+    if not trip:
+        return jsonify({"success": False, "message": "Trip not found"}), 404
+
+    data = request.get_json(silent=True) or {}
+    parts = data.get("parts") or list(ENRICH_PARTS)
+    if not isinstance(parts, list) or any(part not in ENRICH_PARTS for part in parts):
+        return jsonify({"success": False, "message": f"parts must be a subset of {list(ENRICH_PARTS)}"}), 400
+
+    report = trip_enricher.enrich(trip, parts, force=bool(data.get("force")))
+    trip = Trip.query.options(undefer_group("blobs")).filter_by(id=trip_id).first()
+    return jsonify({"success": True, "data": {"parts": report, "trip": trip.to_dict(include_detailed=True)}}), 200
+
+
+@trip_bp.route("/itinerary-jobs/<job_id>", methods=["GET"])
+@jwt_required()
+def get_itinerary_job(job_id):
+    job = ItineraryJob.query.filter_by(id=job_id, user_id=get_jwt_identity()).first()
+    if not job:
+        return jsonify({"success": False, "message": "Job not found"}), 404
+    return jsonify({"success": True, "data": {"job": job.to_dict()}}), 200
+
+
+@trip_bp.route("/itinerary-cache/stats", methods=["GET"])
+@jwt_required()
+def get_itinerary_cache_stats():
+    return jsonify({"success": True, "data": itinerary_cache.stats()}), 200
+
+
+@trip_bp.route("/export", methods=["GET"])
+@jwt_required()
+def export_user_trips():
+    """
+    Streams all of the user's trips as NDJSON (one JSON object per line, id order).
+
+    ?blobs=0 leaves out itinerary and weather. If the download breaks off,
+    ?after_id=<last id received> continues from where it stopped.
+    """
+    include_blobs = request.args.get("blobs", "1").lower() in ("1", "true")
+    after_id = request.args.get("after_id", type=int)
+    return Response(
+        stream_with_context(export_trips(get_jwt_identity(), include_blobs, after_id)),
+        mimetype="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=trips.ndjson", "X-Accel-Buffering": "no"},
+    )
+
+
+@trip_bp.route("/import", methods=["POST"])
+@jwt_required()
+def import_user_trips():
+    """
+    Creates trips from an NDJSON body in the format written by /export.
+
+    Rows are committed in chunks as the body is read. To resume an
+    interrupted upload, send the same ?import_id= again with the whole body,
+    or with only the lines after data.import.lines_done and ?offset= set to
+    that number. Invalid rows are skipped and listed in data.errors.
+    """
+    import_id = request.args.get("import_id")
+    if import_id is not None and not (0 < len(import_id) <= 32 and import_id.replace("-", "").replace("_", "").isalnum()):
+        return jsonify({"success": False, "message": "import_id must be 1-32 letters, digits, - or _"}), 400
+    offset = request.args.get("offset", 0, type=int)
+    if offset < 0:
+        return jsonify({"success": False, "message": "offset must not be negative"}), 400
+
+    # Imports are far larger than the app-wide MAX_CONTENT_LENGTH allows, and are read incrementally.
+    request.max_content_length = TRIP_IMPORT_MAX_BYTES
+    try:
+        job, errors = import_trips(get_jwt_identity(), read_lines(request.stream), import_id, offset)
+    except ImportConflict as e:
+        return jsonify({"success": False, "message": str(e)}), 409
+    return jsonify({"success": True, "data": {"import": job.to_dict(), "errors": errors}}), 200
+
+
+@trip_bp.route("/imports/<import_id>", methods=["GET"])
+@jwt_required()
+def get_trip_import(import_id):
+    job = TripImport.query.filter_by(id=import_id, user_id=get_jwt_identity()).first()
+    if not job:
+        return jsonify({"success": False, "message": "Import not found"}), 404
+    return jsonify({"success": True, "data": {"import": job.to_dict()}}), 200
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@trip_bp.route("/<int:trip_id>/itinerary/stream", methods=["GET"])
+@jwt_required()
+def stream_itinerary(trip_id):
+    """
+    Streams a freshly generated itinerary as Server-Sent Events.
+
+    ?mode=text (default) sends a "chunk" event per Gemini chunk; ?mode=days
+    sends a "day" event per completed day. A final "done" event follows once
+    the full text has been saved to the trip, or an "error" event on failure.
+    ?force=1 skips the itinerary cache.
+    """
+    trip = Trip.query.filter_by(id=trip_id, user_id=get_jwt_identity()).first()
+    if not trip:
+        return jsonify({"success": False, "message": "Trip not found"}), 404
+    mode = request.args.get("mode", "text")
+    force = request.args.get("force", "0").lower() in ("1", "true")
+
+    try:
+        generator = ItineraryGenerator()
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 503
+    inputs = build_generator_inputs(trip, current_user_snapshot())
+
+    def events():
+        parts = []
+
+        def chunks():
+            for chunk in generator.stream_itinerary(**inputs, force_refresh=force):
+                parts.append(chunk)
+                yield chunk
+
+        try:
+            if mode == "days":
+                for day, text in iter_days(chunks()):
+                    yield _sse("day", {"day": day, "text": text})
+            else:
+                for chunk in chunks():
+                    yield _sse("chunk", {"text": chunk})
+
+            # The view's session is gone by the time the stream ends, so reload the trip.
+            saved_trip = db.session.get(Trip, trip_id)
+            saved_trip.set_itinerary_data({"itinerary_text": "".join(parts), "model_used": generator.model})
+            saved_trip.ai_generated = True
+            saved_trip.generation_model = generator.model
+            db.session.commit()
+            yield _sse("done", {"trip_id": trip_id, "model_used": generator.model})
+        except Exception as e:
+            db.session.rollback()
+            yield _sse("error", {"message": str(e)})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        # Stop proxies such as nginx from buffering the stream.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# --- CLI (flask trips ...) ---
+
+@trip_bp.cli.command("sweep-statuses")
+def sweep_statuses_command():
+    """Move planned/active trips whose dates have passed to their new status."""
+    print(f"Updated {sweep_trip_statuses()} trips.")
+
+
+@trip_bp.cli.command("rebuild-stats")
+@click.option("--check", is_flag=True, help="Only report users whose stats are out of date.")
+def rebuild_stats_command(check):
+    """Recompute per-user trip stats from the trips table."""
+    mismatched = rebuild_trip_stats(check_only=check)
+    action = "Out of date" if check else "Fixed"
+    print(f"{action}: {len(mismatched)} users {mismatched[:20]}")
+
 
+@trip_bp.cli.command("install-search")
+def install_search_command():
+    """Create and backfill the trip full-text index on an existing database."""
+    if enable_trip_search(db.engine):
+        print("Trip search index installed; restart the app to start using it.")
+    else:
+        print("FTS5 is not available on this database; trip search keeps using LIKE.")
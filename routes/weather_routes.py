@@ -1,41 +1,46 @@
 # routes/weather_routes.py
 from flask import Blueprint, request, jsonify
 import requests
-import requests_cache
-from retry_requests import retry
-import openmeteo_requests
 import pandas as pd
 import os
+from utils.geocode_cache import geocode_cache
+from utils.metrics import upstream_call
+from utils.weather_client import fetch_forecast
 
 weather_bp = Blueprint('weather', __name__)
 
 # Use your geocoding API key (from environment or config)
 GEOCODING_API_KEY = os.getenv("GEOCODING_API_KEY")
+GOOGLE_MAPS_API_BASE = os.getenv("GOOGLE_MAPS_API_BASE", "https://maps.googleapis.com")
 
 def get_coordinates(city):
-    url = f"https://maps.googleapis.com/maps/api/geocode/json?address={city}&key={GEOCODING_API_KEY}"
-    res = requests.get(url).json()
+    coords = geocode_cache.get_or_fetch(city, None, _fetch_coordinates)
+    if coords is None:
+        raise ValueError("City not found")
+    return coords
+
+def _fetch_coordinates(city, country=None):
+    url = f"{GOOGLE_MAPS_API_BASE}/maps/api/geocode/json?address={city}&key={GEOCODING_API_KEY}"
+    with upstream_call("geocoding"):
+        res = requests.get(url, timeout=10).json()
     if res["status"] == "OK":
         loc = res["results"][0]["geometry"]["location"]
         return loc["lat"], loc["lng"]
+    elif res["status"] == "ZERO_RESULTS":
+        return None
     else:
         raise ValueError("City not found")
 
 def get_weather(city):
     lat, lon = get_coordinates(city)
 
-    cache_session = requests_cache.CachedSession('.cache', expire_after=3600)
-    retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
-    openmeteo = openmeteo_requests.Client(session=retry_session)
-
-    url = "https://api.open-meteo.com/v1/forecast"
     params = {
         "latitude": lat,
         "longitude": lon,
         "hourly": "temperature_2m",
     }
 
-    responses = openmeteo.weather_api(url, params=params)
+    responses = fetch_forecast(params)
     response = responses[0]
 
     hourly = response.Hourly()
@@ -0,0 +1,73 @@
+import itertools
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+from models import db, Trip, User
+
+_ids = itertools.count(1)
+
+
+@pytest.fixture
+def app(tmp_path):
+    from routes.trip_routes import trip_bp
+    from weather_routes import weather_bp
+
+    app = Flask("tests")
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'test.db'}",
+        JWT_SECRET_KEY="test-secret-key-of-sufficient-length",
+    )
+    db.init_app(app)
+    JWTManager(app)
+    app.register_blueprint(trip_bp, url_prefix="/api/trips")
+    app.register_blueprint(weather_bp, url_prefix="/api/weather")
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    def make_user():
+        n = next(_ids)
+        user = User(email=f"user{n}@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make_user
+
+
+@pytest.fixture
+def make_trip(app):
+    def make_trip(user, **fields):
+        start = fields.pop("start_date", date(2026, 1, 1))
+        trip = Trip(
+            user_id=user.id, title=fields.pop("title", "Trip"), destination_city="Paris",
+            destination_country="France", start_date=start, end_date=start + timedelta(days=2), duration=3,
+            **fields,
+        )
+        db.session.add(trip)
+        db.session.commit()
+        return trip
+    return make_trip
+
+
+@pytest.fixture
+def auth_headers(app):
+    def auth_headers(user):
+        return {"Authorization": f"Bearer {create_access_token(identity=str(user.id))}"}
+    return auth_headers
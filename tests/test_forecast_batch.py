@@ -0,0 +1,47 @@
+import pytest
+
+import weather_routes
+
+
+@pytest.fixture(autouse=True)
+def no_upstream(monkeypatch):
+    """Fails any test that would geocode or fetch a forecast."""
+    def upstream(*args, **kwargs):
+        raise AssertionError("upstream called")
+    monkeypatch.setattr(weather_routes, "_try_get_coordinates", upstream)
+    monkeypatch.setattr(weather_routes, "get_weather_data_many", upstream)
+
+
+@pytest.mark.parametrize("body, error", [
+    (["Paris"], "Body must be a JSON object"),
+    ({}, "cities or trip_ids is required"),
+    ({"cities": "Paris"}, "cities and trip_ids must be lists"),
+    ({"trip_ids": "12"}, "cities and trip_ids must be lists"),
+    ({"trip_ids": [{"a": 1}]}, "Each trip id must be an integer"),
+    ({"trip_ids": ["12"]}, "Each trip id must be an integer"),
+    ({"trip_ids": [True]}, "Each trip id must be an integer"),
+    ({"cities": [3]}, "Each city must be"),
+    ({"cities": [{"city": ["Paris"]}]}, "Each city must be"),
+    ({"cities": [{"city": "Paris", "country": 1}]}, "Each city must be"),
+    ({"cities": ["Paris"] * (weather_routes.MAX_BATCH_LOCATIONS + 1)}, "locations per batch"),
+])
+def test_malformed_batches_are_rejected(client, body, error):
+    response = client.post("/api/weather/forecast/batch", json=body)
+    assert response.status_code == 400
+    assert error in response.get_json()["error"]
+
+
+def test_valid_batch_is_forecast(client, monkeypatch, make_user, make_trip, auth_headers):
+    user = make_user()
+    trip = make_trip(user, latitude=48.9, longitude=2.4)
+    monkeypatch.setattr(weather_routes, "_try_get_coordinates", lambda city, country: ((35.7, 139.7), None))
+    monkeypatch.setattr(weather_routes, "get_weather_data_many", lambda requests, fmt: [{"n": i} for i in range(len(requests))])
+
+    response = client.post("/api/weather/forecast/batch", headers=auth_headers(user), json={
+        "cities": [{"city": "Tokyo", "country": "Japan"}], "trip_ids": [trip.id, trip.id + 1],
+    })
+    results = response.get_json()["results"]
+    assert response.status_code == 200
+    assert results["cities"]["Tokyo,Japan"]["latitude"] == 35.7
+    assert results["trips"][str(trip.id)]["latitude"] == 48.9
+    assert results["trips"][str(trip.id + 1)] == {"error": "Trip not found"}
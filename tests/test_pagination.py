@@ -0,0 +1,75 @@
+from datetime import date, datetime
+
+import pytest
+
+from models import Trip
+from utils.pagination import decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def trips(make_user, make_trip):
+    """Seven trips whose sort columns are mostly equal, so pages split inside runs of ties."""
+    user = make_user()
+    for i in range(7):
+        make_trip(
+            user, title="Same" if i % 2 else f"Trip {i // 2}", start_date=date(2026, 1, 1 + i % 3),
+            created_at=datetime(2026, 1, 1, 12, 0, 0),
+        )
+    return user
+
+
+def _walk(client, headers, sort_by, sort_order, per_page=2):
+    ids, cursor, pages = [], None, 0
+    while True:
+        url = f"/api/trips/?per_page={per_page}&sort_by={sort_by}&sort_order={sort_order}"
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""), headers=headers)
+        assert response.status_code == 200
+        data = response.get_json()["data"]
+        ids += [trip["id"] for trip in data["trips"]]
+        pages += 1
+        cursor = data["pagination"]["next_cursor"]
+        assert data["pagination"]["has_more"] == (cursor is not None)
+        if cursor is None:
+            return ids, pages
+
+
+@pytest.mark.parametrize("sort_by", ["created_at", "updated_at", "start_date", "end_date", "title"])
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_pages_cover_every_trip_once_in_order(client, auth_headers, trips, sort_by, sort_order):
+    ids, pages = _walk(client, auth_headers(trips), sort_by, sort_order)
+
+    expected = sorted(Trip.query.filter_by(user_id=trips.id), key=lambda t: (getattr(t, sort_by), t.id),
+                      reverse=sort_order == "desc")
+    assert ids == [trip.id for trip in expected]
+    assert pages == 4
+
+
+def test_last_page_exactly_full_has_no_cursor(client, auth_headers, trips):
+    ids, pages = _walk(client, auth_headers(trips), "created_at", "desc", per_page=7)
+    assert (len(ids), pages) == (7, 1)
+
+
+def test_cursor_round_trips_dates_and_datetimes():
+    for column, value in ((Trip.start_date, date(2026, 3, 4)), (Trip.created_at, datetime(2026, 3, 4, 5, 6, 7, 8))):
+        cursor = encode_cursor(column.key, "asc", value, 42)
+        assert decode_cursor(cursor, column.key, "asc", column) == (value, 42)
+
+
+def test_cursor_for_another_sort_is_rejected(client, auth_headers, trips):
+    cursor = encode_cursor("title", "asc", "Same", 1)
+    response = client.get(f"/api/trips/?sort_by=title&sort_order=desc&cursor={cursor}", headers=auth_headers(trips))
+    assert response.status_code == 400
+    assert "does not match" in response.get_json()["message"]
+
+
+def test_malformed_cursor_is_rejected(client, auth_headers, trips):
+    response = client.get("/api/trips/?cursor=not-a-cursor", headers=auth_headers(trips))
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("per_page", [0, -5])
+def test_non_positive_per_page_is_clamped_to_one(client, auth_headers, trips, per_page):
+    response = client.get(f"/api/trips/?per_page={per_page}", headers=auth_headers(trips))
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert (len(data["trips"]), data["pagination"]["per_page"], data["pagination"]["has_more"]) == (1, 1, True)
@@ -0,0 +1,42 @@
+from sqlalchemy import text
+
+from models import db
+from utils import trip_search
+
+
+def _search(client, headers, term):
+    response = client.get(f"/api/trips/?search={term}", headers=headers)
+    assert response.status_code == 200
+    return sorted(trip["title"] for trip in response.get_json()["data"]["trips"])
+
+
+def test_search_matches_word_prefixes(client, make_user, make_trip, auth_headers):
+    user = make_user()
+    make_trip(user, title="Louvre weekend")
+    make_trip(user, title="Beach week")
+    assert trip_search.fts_available(db.session)
+    assert _search(client, auth_headers(user), "louv") == ["Louvre weekend"]
+
+
+def test_search_without_words_still_filters(client, make_user, make_trip, auth_headers):
+    user = make_user()
+    make_trip(user, title="Wow!! Paris")
+    make_trip(user, title="Quiet Paris")
+    assert _search(client, auth_headers(user), "!!") == ["Wow!! Paris"]
+
+
+def test_install_search_indexes_an_existing_database(app, client, make_user, make_trip, auth_headers):
+    # A database created before the index existed: no trips_fts, no triggers.
+    for name in ("trips_fts_insert", "trips_fts_update", "trips_fts_delete"):
+        db.session.execute(text(f"DROP TRIGGER {name}"))
+    db.session.execute(text("DROP TABLE trips_fts"))
+    db.session.commit()
+    trip_search._available.pop(db.engine.url)
+    user = make_user()
+    make_trip(user, title="Louvre weekend")
+    assert not trip_search.fts_available(db.session)
+
+    result = app.test_cli_runner().invoke(args=["trips", "install-search"])
+    assert "installed" in result.output
+    assert trip_search.fts_available(db.session)
+    assert _search(client, auth_headers(user), "louv") == ["Louvre weekend"]
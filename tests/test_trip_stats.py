@@ -0,0 +1,62 @@
+from models import db, UserBudgetTotal, UserTripStats
+from utils.trip_stats import get_user_stats, rebuild_trip_stats
+
+
+def test_new_trips_are_counted(make_user, make_trip):
+    user = make_user()
+    make_trip(user, budget_amount=100, budget_currency="EUR")
+    make_trip(user, status="completed", budget_amount=50, budget_currency="EUR")
+
+    stats = get_user_stats(user.id)
+    assert stats["total_trips"] == 2
+    assert stats["upcoming_trips"] == 1
+    assert stats["completed_trips"] == 1
+    assert stats["total_budget"] == {"EUR": 150}
+    assert rebuild_trip_stats(check_only=True) == []
+
+
+def test_status_change_moves_the_count(make_user, make_trip):
+    user = make_user()
+    trip = make_trip(user)
+    trip.status = "active"
+    db.session.commit()
+
+    stats = get_user_stats(user.id)
+    assert (stats["total_trips"], stats["upcoming_trips"], stats["active_trips"]) == (1, 0, 1)
+    assert rebuild_trip_stats(check_only=True) == []
+
+
+def test_trip_delete(make_user, make_trip):
+    user = make_user()
+    keep = make_trip(user, budget_amount=10)
+    gone = make_trip(user, budget_amount=30)
+    db.session.delete(gone)
+    db.session.commit()
+
+    stats = get_user_stats(user.id)
+    assert stats["total_trips"] == 1
+    assert stats["total_budget"] == {"USD": keep.budget_amount}
+    assert rebuild_trip_stats(check_only=True) == []
+
+
+def test_user_delete_leaves_no_stats_behind(make_user, make_trip):
+    user = make_user()
+    make_trip(user, budget_amount=100, budget_currency="EUR")
+    user_id = user.id
+    db.session.delete(user)
+    db.session.commit()
+
+    assert db.session.get(UserTripStats, user_id) is None
+    assert UserBudgetTotal.query.filter_by(user_id=user_id).count() == 0
+    assert rebuild_trip_stats(check_only=True) == []
+
+
+def test_rebuild_repairs_drifted_stats(make_user, make_trip):
+    user = make_user()
+    make_trip(user)
+    db.session.get(UserTripStats, user.id).total_trips = 5
+    db.session.commit()
+
+    assert rebuild_trip_stats(check_only=True) == [user.id]
+    assert rebuild_trip_stats() == [user.id]
+    assert rebuild_trip_stats(check_only=True) == []
@@ -0,0 +1,119 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from models import db, Trip, TripImport
+from utils.trip_stats import get_user_stats, rebuild_trip_stats
+from utils.trip_transfer import ImportConflict, import_trips, validate_row
+
+
+def _line(i, **fields):
+    row = {
+        "title": f"Trip {i}", "destination_city": "Paris", "destination_country": "France",
+        "start_date": "2026-01-01", "end_date": "2026-01-03", "budget": {"amount": 10, "currency": "EUR"},
+    }
+    row.update(fields)
+    return json.dumps(row) + "\n"
+
+
+def _body(n):
+    return "".join(_line(i) for i in range(n)).encode()
+
+
+def _interrupted(lines, after):
+    """Yields `after` lines, then fails like a dropped connection."""
+    for i, line in enumerate(lines):
+        if i == after:
+            raise ConnectionError("client went away")
+        yield line
+
+
+@pytest.mark.parametrize("fields, error", [
+    ({"ai_generated": "false"}, "ai_generated must be true or false"),
+    ({"budget": {"amount": 1e999}}, "budget.amount must be a finite number"),
+    ({"latitude": float("nan")}, "latitude must be a finite number"),
+    ({"budget": {"amount": -1}}, "budget.amount must be at least 0"),
+    ({"end_date": "2025-12-31"}, "end_date is before start_date"),
+    ({"status": "cancelled"}, "status must be one of"),
+])
+def test_validate_row_rejects(fields, error):
+    with pytest.raises(ValueError, match=error):
+        validate_row(json.loads(_line(0, **fields)), 1, datetime.utcnow())
+
+
+def test_validate_row_defaults():
+    row = validate_row(json.loads(_line(0, ai_generated=True)), 1, datetime.utcnow())
+    assert (row["duration"], row["status"], row["ai_generated"], row["budget_amount"]) == (3, "planned", True, 10.0)
+
+
+def test_import_reports_rejected_rows_and_keeps_stats(client, make_user, auth_headers):
+    user = make_user()
+    body = _line(0) + "not json\n\n" + _line(1, ai_generated="yes") + _line(2)
+    response = client.post("/api/trips/import", data=body, headers=auth_headers(user))
+
+    data = response.get_json()["data"]
+    assert response.status_code == 200
+    assert (data["import"]["inserted"], data["import"]["rejected"], data["import"]["lines_done"]) == (2, 2, 5)
+    assert [error["line"] for error in data["errors"]] == [2, 4]
+    assert get_user_stats(user.id)["total_trips"] == 2
+    assert rebuild_trip_stats(check_only=True) == []
+
+
+def test_interrupted_import_resumes_without_duplicates(make_user):
+    user = make_user()
+    lines = _body(10).splitlines(True)
+    with pytest.raises(ConnectionError):
+        import_trips(user.id, _interrupted(lines, 7), "resume-me", chunk_size=3)
+    # Only whole chunks were committed: lines 1-6.
+    assert db.session.get(TripImport, "resume-me").lines_done == 6
+    assert Trip.query.count() == 6
+
+    job, _ = import_trips(user.id, lines, "resume-me", chunk_size=3)
+    assert (job.lines_done, job.inserted, job.status) == (10, 10, "completed")
+    assert [trip.title for trip in Trip.query.order_by(Trip.id)] == [f"Trip {i}" for i in range(10)]
+    assert rebuild_trip_stats(check_only=True) == []
+
+    # Sending everything again is a no-op.
+    job, _ = import_trips(user.id, lines, "resume-me", chunk_size=3)
+    assert (job.inserted, Trip.query.count()) == (10, 10)
+
+
+def test_resume_with_offset_sends_only_the_rest(make_user):
+    user = make_user()
+    lines = _body(5).splitlines(True)
+    with pytest.raises(ConnectionError):
+        import_trips(user.id, _interrupted(lines, 3), "offset", chunk_size=2)
+    done = db.session.get(TripImport, "offset").lines_done
+    assert done == 2
+
+    job, _ = import_trips(user.id, lines[done:], "offset", offset=done, chunk_size=2)
+    assert (job.lines_done, job.inserted, Trip.query.count()) == (5, 5, 5)
+
+
+def test_resume_conflicts(make_user):
+    owner, other = make_user(), make_user()
+    import_trips(owner.id, _body(2).splitlines(True), "taken")
+    with pytest.raises(ImportConflict, match="already in use"):
+        import_trips(other.id, [], "taken")
+    with pytest.raises(ImportConflict, match="only lines 1-2 are done"):
+        import_trips(owner.id, [], "taken", offset=3)
+
+
+def test_export_round_trip(client, make_user, auth_headers):
+    source, target = make_user(), make_user()
+    client.post("/api/trips/import", data=_body(3), headers=auth_headers(source))
+
+    response = client.get("/api/trips/export", headers=auth_headers(source))
+    assert response.mimetype == "application/x-ndjson"
+    exported = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row["title"] for row in exported] == ["Trip 0", "Trip 1", "Trip 2"]
+
+    rest = client.get(f"/api/trips/export?after_id={exported[0]['id']}&blobs=0", headers=auth_headers(source))
+    rows = [json.loads(line) for line in rest.get_data(as_text=True).splitlines()]
+    assert [row["id"] for row in rows] == [row["id"] for row in exported[1:]]
+    assert "itinerary" not in rows[0]
+
+    client.post("/api/trips/import", data=response.get_data(), headers=auth_headers(target))
+    assert Trip.query.filter_by(user_id=target.id).count() == 3
+    assert rebuild_trip_stats(check_only=True) == []
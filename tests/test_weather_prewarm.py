@@ -0,0 +1,52 @@
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from models import db, Trip
+from utils import weather_prewarm
+
+TODAY = date(2026, 1, 1)
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def refreshed(monkeypatch):
+    """Records the trips whose forecasts were fetched."""
+    fetched = []
+    def get_weather_data_many(requests, fmt):
+        fetched.extend(requests)
+        return [{"days": []} for _ in requests]
+    monkeypatch.setattr(weather_prewarm, "get_weather_data_many", get_weather_data_many)
+    return fetched
+
+
+@pytest.mark.parametrize("weather, due", [
+    (None, True),
+    ({"fetched_at": NOW.isoformat()}, False),
+    ({"fetched_at": (NOW - timedelta(days=1)).isoformat()}, True),
+    ({"fetched_at": NOW.isoformat() + "+00:00"}, False),
+    ({"fetched_at": "yesterday"}, True),
+    ({"fetched_at": 5}, True),
+    ({"fetched_at": None}, True),
+    (["not", "a", "dict"], True),
+])
+def test_stored_forecast_decides_whether_a_trip_is_due(make_user, make_trip, refreshed, weather, due):
+    trip = make_trip(make_user(), start_date=TODAY + timedelta(days=1), latitude=48.9, longitude=2.4,
+                     weather_data=None if weather is None else json.dumps(weather))
+
+    result = weather_prewarm.prewarm_trips(today=TODAY, now=NOW)
+    assert result["forecasts_stored"] == (1 if due else 0)
+    if due:
+        assert db.session.get(Trip, trip.id).get_weather_data()["fetched_at"]
+
+
+def test_one_bad_fetched_at_does_not_stop_the_run(make_user, make_trip, refreshed):
+    user = make_user()
+    for fetched_at in ("garbage", 5, "2026-13-45T00:00:00"):
+        make_trip(user, start_date=TODAY + timedelta(days=2), latitude=48.9, longitude=2.4,
+                  weather_data=json.dumps({"fetched_at": fetched_at}))
+    make_trip(user, start_date=TODAY + timedelta(days=2), latitude=48.9, longitude=2.4)
+
+    assert weather_prewarm.prewarm_trips(today=TODAY, now=NOW)["forecasts_stored"] == 4
+    assert len(refreshed) == 4
@@ -0,0 +1,67 @@
+"""
+Response compression for JSON and text bodies of at least COMPRESS_MIN_SIZE bytes.
+
+Uses brotli when the optional `brotli` package is installed and the client
+accepts it, gzip otherwise. Streamed responses (SSE, NDJSON export) are left
+alone so they keep flushing as they are produced. Install with
+init_compression(app) after init_metrics(app), so the time spent counts
+towards the request's "serialize" phase.
+"""
+import gzip
+import os
+
+from flask import request
+
+from utils.metrics import timed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", 6))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", 4))
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "text/")
+
+
+def _choose_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress_response(response):
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or not response.mimetype.startswith(COMPRESSIBLE_TYPES)
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = _choose_encoding()
+    if encoding is None or response.content_length is None or response.content_length < COMPRESS_MIN_SIZE:
+        return response
+
+    with timed("serialize"):
+        data = response.get_data()
+        if encoding == "br":
+            body = brotli.compress(data, quality=COMPRESS_BROTLI_QUALITY)
+        else:
+            body = gzip.compress(data, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    # A strong ETag promises byte-identical bodies, which no longer holds.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
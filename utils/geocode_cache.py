@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+from utils.metrics import record_cache
+
+
+def normalize_key(city, country=None):
+    """Builds a cache key such that ' paris ,France' and 'Paris, france' match."""
+    parts = [city, country] if country else [city]
+    return ",".join(" ".join(str(p).split()).lower() for p in parts)
+
+
+class _InFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class GeocodeCache:
+    """
+    Two-level geocode cache: an in-process LRU in front of a SQLite table.
+
+    Entries hold (lat, lon), or None for places the geocoder could not find.
+    Misses are cached for `negative_ttl` so typos don't keep costing quota,
+    but expire sooner than hits in case the place becomes resolvable.
+    Concurrent misses for the same key wait on a single outbound call.
+    """
+    def __init__(self, path, maxsize=1024, ttl=30 * 24 * 3600, negative_ttl=3600):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocodes ("
+                "key TEXT PRIMARY KEY, lat REAL, lon REAL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    # --- LRU ---
+
+    def _lru_get(self, key, now):
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is None:
+                return False, None
+            coords, expires_at = entry
+            if expires_at <= now:
+                del self._lru[key]
+                return False, None
+            self._lru.move_to_end(key)
+            return True, coords
+
+    def _lru_put(self, key, coords, expires_at):
+        with self._lock:
+            self._lru[key] = (coords, expires_at)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+
+    # --- SQLite ---
+
+    def _db_get(self, key, now):
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT lat, lon, expires_at FROM geocodes WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[2] <= now:
+            return False, None, None
+        coords = (row[0], row[1]) if row[0] is not None else None
+        return True, coords, row[2]
+
+    def _db_put(self, key, coords, expires_at):
+        lat, lon = coords if coords is not None else (None, None)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO geocodes (key, lat, lon, expires_at) VALUES (?, ?, ?, ?)",
+                (key, lat, lon, expires_at),
+            )
+
+    # --- Public API ---
+
+    def get(self, city, country=None):
+        """Returns (found, coords) without calling the geocoder."""
+        key = normalize_key(city, country)
+        now = time.time()
+        found, coords = self._lru_get(key, now)
+        if found:
+            return True, coords
+        found, coords, expires_at = self._db_get(key, now)
+        if found:
+            self._lru_put(key, coords, expires_at)
+        return found, coords
+
+    def put(self, city, country, coords):
+        key = normalize_key(city, country)
+        expires_at = time.time() + (self.ttl if coords is not None else self.negative_ttl)
+        self._db_put(key, coords, expires_at)
+        self._lru_put(key, coords, expires_at)
+
+    def get_or_fetch(self, city, country, fetch):
+        """
+        Returns cached coords for the place, calling `fetch(city, country)` on a miss.
+
+        `fetch` must return (lat, lon), or None when the place does not exist.
+        Exceptions from `fetch` are propagated to every waiting caller and
+        are not cached.
+        """
+        found, coords = self.get(city, country)
+        record_cache("geocode", found)
+        if found:
+            return coords
+
+        key = normalize_key(city, country)
+        with self._lock:
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _InFlight()
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fetch(city, country)
+            self.put(city, country, flight.result)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight.event.set()
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM geocodes")
+
+
+geocode_cache = GeocodeCache(
+    os.getenv("GEOCODE_CACHE_PATH", os.path.join("instance", "geocode_cache.db")),
+    maxsize=int(os.getenv("GEOCODE_CACHE_SIZE", 1024)),
+    ttl=int(os.getenv("GEOCODE_CACHE_TTL", 30 * 24 * 3600)),
+    negative_ttl=int(os.getenv("GEOCODE_NEGATIVE_TTL", 3600)),
+)
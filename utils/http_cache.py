@@ -0,0 +1,52 @@
+"""
+Conditional GET: weak ETags, validator headers and 304 Not Modified responses.
+
+Routes compute an ETag from whatever their body is derived from *before*
+building the body, so a client polling with If-None-Match gets an empty
+304 without the query, transform or serialization work. ETags are weak
+because compression (utils/compression.py) changes the bytes but not the
+meaning of the body.
+"""
+import hashlib
+import json
+from datetime import timezone
+
+from flask import Response, request
+
+
+def make_etag(*parts):
+    """A short stable hash of JSON-serializable parts (datetimes are stringified)."""
+    encoded = json.dumps(parts, default=str, separators=(",", ":")).encode()
+    return hashlib.sha1(encoded).hexdigest()[:32]
+
+
+def _utc(moment):
+    moment = moment.replace(microsecond=0)
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+
+def is_not_modified(etag, last_modified=None):
+    """
+    True if the client's copy is current, so a 304 may be sent.
+
+    If-None-Match takes precedence; If-Modified-Since is only checked when it
+    is absent and a last_modified (naive datetimes are UTC) is given.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return _utc(last_modified) <= request.if_modified_since
+    return False
+
+
+def add_validators(response, etag, last_modified=None, cache_control="no-cache"):
+    """Sets ETag, Last-Modified and Cache-Control (by default: store, but revalidate every time)."""
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = _utc(last_modified)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def not_modified(etag, last_modified=None, cache_control="no-cache"):
+    return add_validators(Response(status=304), etag, last_modified, cache_control)
@@ -1,31 +1,65 @@
 import os
+import re
 import requests
 import json
+from utils.itinerary_cache import cache_key, itinerary_cache
+from utils.metrics import upstream_call
+
+def split_cached_flag(result):
+    """
+    Returns (itinerary, cached) for a generate_itinerary result.
+
+    The "cached" marker describes this call, not the itinerary, so it must not
+    be stored with it (Trip.itinerary_data, job results).
+    """
+    itinerary = dict(result)
+    return itinerary, bool(itinerary.pop("cached", False))
 
 class ItineraryGenerator:
     """
     A class to handle the generation of travel itineraries using the Google Gemini AI model.
     """
-    def __init__(self):
+    def __init__(self, timeout=None, cache=None):
         """Initializes the generator and retrieves the API key."""
         self.api_key = os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             raise ValueError("⚠️ GEMINI_API_KEY environment variable not set.")
+
+        # Seconds to wait for Gemini; generation is slow, but must never hang forever.
+        self.timeout = timeout or float(os.getenv("GEMINI_TIMEOUT", 60))
+        self.cache = cache if cache is not None else itinerary_cache
         
-        self.api_url = (
-            f"https://generativelanguage.googleapis.com/v1beta/models/"
-            f"gemini-1.5-flash:generateContent?key={self.api_key}"
+        # GEMINI_API_BASE lets tests and benchmarks point at a local stub server.
+        self.model = "gemini-1.5-flash"
+        base_url = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com")
+        self.api_url = f"{base_url}/v1beta/models/{self.model}:generateContent?key={self.api_key}"
+        self.stream_url = (
+            f"{base_url}/v1beta/models/{self.model}:streamGenerateContent?alt=sse&key={self.api_key}"
         )
 
-    def generate_itinerary(self, destination_data, duration, interests, budget_data, preferences, start_date=None):
-        """Generates a travel itinerary by calling the Gemini API."""
+    def generate_itinerary(self, destination_data, duration, interests, budget_data, preferences, start_date=None,
+                           force_refresh=False):
+        """
+        Generates a travel itinerary by calling the Gemini API.
+
+        Results are cached by their normalized inputs (see itinerary_cache.cache_key);
+        a cached result is returned with "cached": True unless force_refresh is set
+        (strip it with split_cached_flag before storing the result).
+        """
+        key = cache_key(destination_data, duration, interests, budget_data, preferences)
+        if not force_refresh:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return dict(cached, cached=True)
+
         prompt = self._build_prompt(destination_data, duration, interests, budget_data, preferences, start_date)
 
         payload = {"contents": [{"parts": [{"text": prompt}]}]}
 
         try:
-            response = requests.post(self.api_url, json=payload)
-            response.raise_for_status()
+            with upstream_call("gemini"):
+                response = requests.post(self.api_url, json=payload, timeout=self.timeout)
+                response.raise_for_status()
             data = response.json()
 
             candidates = data.get("candidates", [])
@@ -33,13 +67,59 @@ class ItineraryGenerator:
                 raise ValueError("No candidates in Gemini response")
 
             itinerary_text = candidates[0]["content"]["parts"][0]["text"]
-            return {"itinerary_text": itinerary_text, "model_used": "gemini-1.5-flash"}
+            result = {"itinerary_text": itinerary_text, "model_used": self.model}
+            self.cache.put(key, result)
+            return result
 
         except requests.exceptions.RequestException as e:
             raise ConnectionError(f"Network error calling Gemini API: {e}")
         except (KeyError, IndexError) as e:
             raise ValueError(f"Unexpected response format: {e}")
 
+    def stream_itinerary(self, destination_data, duration, interests, budget_data, preferences, start_date=None,
+                         force_refresh=False):
+        """
+        Streams the itinerary text from Gemini's streamGenerateContent endpoint.
+
+        Yields text chunks as Gemini produces them; the concatenation of all
+        chunks is the same text generate_itinerary would return. A cached
+        itinerary is yielded as a single chunk, and a completed stream is cached.
+        """
+        key = cache_key(destination_data, duration, interests, budget_data, preferences)
+        if not force_refresh:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached["itinerary_text"]
+                return
+
+        parts = []
+        prompt = self._build_prompt(destination_data, duration, interests, budget_data, preferences, start_date)
+
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+
+        try:
+            # Timed up to the response headers; the body streams after the request has been answered.
+            with upstream_call("gemini_stream"):
+                response = requests.post(self.stream_url, json=payload, timeout=self.timeout, stream=True)
+            with response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    # Server-Sent Events: each event is a "data: {json}" line.
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = json.loads(line[len("data:"):])
+                    for candidate in data.get("candidates", [])[:1]:
+                        for part in candidate.get("content", {}).get("parts", []):
+                            if part.get("text"):
+                                parts.append(part["text"])
+                                yield part["text"]
+            self.cache.put(key, {"itinerary_text": "".join(parts), "model_used": self.model})
+
+        except requests.exceptions.RequestException as e:
+            raise ConnectionError(f"Network error calling Gemini API: {e}")
+        except (ValueError, AttributeError) as e:
+            raise ValueError(f"Unexpected response format: {e}")
+
     def _build_prompt(self, destination, duration, interests, budget, preferences, start_date):
         """Constructs a detailed prompt for the AI."""
         prompt = f"""
@@ -56,3 +136,27 @@ class ItineraryGenerator:
         Each activity should include a short engaging description and practical local tips.
         """
         return prompt.strip()
+
+
+DAY_HEADER = re.compile(r"^[\s#*]*Day\s+(\d+)\b", re.IGNORECASE | re.MULTILINE)
+
+def iter_days(chunks):
+    """
+    Regroups streamed text chunks into whole days.
+
+    Yields (day_number, text) once the next "Day N" heading has arrived, so
+    each day is complete. Text before the first heading is yielded as day 0.
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        headers = list(DAY_HEADER.finditer(buffer))
+        if headers and buffer[:headers[0].start()].strip():
+            yield 0, buffer[:headers[0].start()].strip()
+        for current, following in zip(headers, headers[1:]):
+            yield int(current.group(1)), buffer[current.start():following.start()].strip()
+        if headers:
+            buffer = buffer[headers[-1].start():]
+    if buffer.strip():
+        match = DAY_HEADER.match(buffer)
+        yield (int(match.group(1)) if match else 0), buffer.strip()
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+from utils.metrics import record_cache
+
+# Upper bounds of daily spend for each budget band; anything above is "luxury".
+BUDGET_BANDS = [(75, "budget"), (250, "moderate")]
+
+
+def budget_band(budget, duration):
+    amount = (budget or {}).get("amount")
+    if not amount or not duration:
+        return "unspecified"
+    per_day = float(amount) / int(duration)
+    for limit, band in BUDGET_BANDS:
+        if per_day < limit:
+            return band
+    return "luxury"
+
+
+def _norm(value):
+    return " ".join(str(value or "").split()).lower()
+
+
+def cache_key(destination, duration, interests, budget, preferences):
+    """
+    Hashes the normalized prompt inputs that decide what Gemini will write.
+
+    The exact budget amount and start date are left out: trips that only
+    differ in those get the same itinerary.
+    """
+    normalized = {
+        "city": _norm(destination.get("city")),
+        "country": _norm(destination.get("country")),
+        "duration": int(duration),
+        "interests": sorted({_norm(i) for i in interests or [] if _norm(i)}),
+        "budget": [budget_band(budget, duration), _norm((budget or {}).get("currency"))],
+        "travel_style": _norm((preferences or {}).get("travel_style")),
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+class ItineraryCache:
+    """
+    Size-bounded itinerary cache: an in-process LRU in front of a SQLite table.
+
+    Entries expire after `ttl` seconds. The SQLite table keeps at most
+    `max_entries` rows, evicting the least recently used ones on insert.
+    """
+    def __init__(self, path, maxsize=256, max_entries=10000, ttl=7 * 24 * 3600):
+        self.path = path
+        self.maxsize = maxsize
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS itineraries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_itineraries_accessed_at ON itineraries (accessed_at)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _count(self, hit):
+        record_cache("itinerary", hit)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._lru[key]
+                entry = None
+            if entry is not None:
+                self._lru.move_to_end(key)
+        if entry is not None:
+            self._count(True)
+            return entry[0]
+
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM itineraries WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE itineraries SET accessed_at = ? WHERE key = ?", (now, key))
+        if row is None:
+            self._count(False)
+            return None
+
+        value = json.loads(row[0])
+        self._lru_put(key, value, row[1])
+        self._count(True)
+        return value
+
+    def put(self, key, value):
+        now = time.time()
+        expires_at = now + self.ttl
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO itineraries (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            conn.execute("DELETE FROM itineraries WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "DELETE FROM itineraries WHERE key IN ("
+                "SELECT key FROM itineraries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        self._lru_put(key, value, expires_at)
+
+    def _lru_put(self, key, value, expires_at):
+        with self._lock:
+            self._lru[key] = (value, expires_at)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            hits, misses, in_memory = self.hits, self.misses, len(self._lru)
+        with closing(self._connect()) as conn:
+            stored = conn.execute("SELECT COUNT(*) FROM itineraries").fetchone()[0]
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0.0,
+            "in_memory": in_memory,
+            "stored": stored,
+        }
+
+
+itinerary_cache = ItineraryCache(
+    os.getenv("ITINERARY_CACHE_PATH", os.path.join("instance", "itinerary_cache.db")),
+    maxsize=int(os.getenv("ITINERARY_CACHE_SIZE", 256)),
+    max_entries=int(os.getenv("ITINERARY_CACHE_MAX_ENTRIES", 10000)),
+    ttl=int(os.getenv("ITINERARY_CACHE_TTL", 7 * 24 * 3600)),
+)
@@ -0,0 +1,187 @@
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from models import db, ItineraryJob, Trip
+from utils.itinerary_ai import ItineraryGenerator, split_cached_flag
+from utils.user_cache import load_user
+
+ACTIVE_STATUSES = ("queued", "running")
+STALE_AFTER = timedelta(minutes=10)
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity; callers should retry later."""
+
+
+def build_generator_inputs(trip, user):
+    """Maps a trip (falling back to the owner's preferences) onto generate_itinerary's arguments."""
+    return {
+        "destination_data": {"city": trip.destination_city, "country": trip.destination_country},
+        "duration": trip.duration,
+        "interests": trip.get_interests() or user.get_interests(),
+        "budget_data": {"amount": trip.budget_amount, "currency": trip.budget_currency},
+        "preferences": {"travel_style": trip.travel_style or user.travel_style},
+        "start_date": trip.start_date.isoformat() if trip.start_date else None,
+    }
+
+
+class ItineraryJobQueue:
+    """
+    Runs itinerary generation in a bounded background thread pool.
+
+    Job state lives in the itinerary_jobs table, so status polling works from
+    any worker process and queued jobs survive a restart (see recover). A
+    partial unique index on trip_id keeps at most one active job per trip;
+    a duplicate submission gets the existing job back.
+    """
+    def __init__(self, max_workers=None, max_pending=None):
+        self.max_workers = max_workers or int(os.getenv("ITINERARY_WORKERS", 2))
+        self.max_pending = max_pending or int(os.getenv("ITINERARY_MAX_PENDING", 50))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="itinerary"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._app = None
+        self._recovered = False
+
+    def init_app(self, app):
+        """
+        Binds the queue to the app; jobs left behind by a restart are
+        re-enqueued before it serves its first request (see recover).
+
+        Registering trip_bp calls this, so every app serving the itinerary
+        routes recovers its jobs. Calling it again for the same app is a no-op.
+        """
+        if self._app is app:
+            return
+        self._app = app
+        self._recovered = False
+        app.before_request(self._recover_once)
+
+    def _recover_once(self):
+        with self._lock:
+            if self._recovered:
+                return
+            self._recovered = True
+        self.recover()
+
+    def recover(self):
+        """
+        Re-enqueues queued jobs, and jobs that have been "running" for longer
+        than STALE_AFTER (their worker died).
+        """
+        with self._app.app_context():
+            cutoff = datetime.utcnow() - STALE_AFTER
+            stale = ItineraryJob.query.filter(
+                (ItineraryJob.status == "queued") |
+                ((ItineraryJob.status == "running") & (ItineraryJob.started_at < cutoff))
+            ).all()
+            for job in stale:
+                job.status = "queued"
+                job.started_at = None
+            db.session.commit()
+            for job in stale:
+                self._enqueue(job.id, force=True)
+
+    def submit(self, trip, force_refresh=False):
+        """
+        Returns (job, created): the trip's active job, or a newly enqueued one.
+
+        force_refresh bypasses the itinerary cache for the new job.
+        """
+        existing = self.active_job(trip.id)
+        if existing:
+            return existing, False
+
+        self._reserve()
+        job = ItineraryJob(id=uuid.uuid4().hex, trip_id=trip.id, user_id=trip.user_id)
+        db.session.add(job)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Lost a race with a concurrent submission for the same trip; the
+            # winning job may already have finished, so fall back to the latest one.
+            db.session.rollback()
+            self._release()
+            return self.active_job(trip.id) or self.latest_job(trip.id), False
+
+        self._start(job.id, force_refresh)
+        return job, True
+
+    def active_job(self, trip_id):
+        return ItineraryJob.query.filter(
+            ItineraryJob.trip_id == trip_id, ItineraryJob.status.in_(ACTIVE_STATUSES)
+        ).first()
+
+    def latest_job(self, trip_id):
+        return (
+            ItineraryJob.query.filter_by(trip_id=trip_id)
+            .order_by(ItineraryJob.created_at.desc(), ItineraryJob.id.desc())
+            .first()
+        )
+
+    def _reserve(self, force=False):
+        with self._lock:
+            if not force and self._pending >= self.max_pending:
+                raise QueueFullError("Itinerary generation queue is full, try again later")
+            self._pending += 1
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _enqueue(self, job_id, force=False):
+        self._reserve(force)
+        self._start(job_id)
+
+    def _start(self, job_id, force_refresh=False):
+        app = self._app or current_app._get_current_object()
+        self._executor.submit(self._run, app, job_id, force_refresh)
+
+    def _run(self, app, job_id, force_refresh):
+        try:
+            with app.app_context():
+                self._execute(job_id, force_refresh)
+        finally:
+            self._release()
+
+    def _execute(self, job_id, force_refresh):
+        # Claim the job atomically so only one worker process ever runs it.
+        claimed = ItineraryJob.query.filter_by(id=job_id, status="queued").update(
+            {"status": "running", "started_at": datetime.utcnow()}
+        )
+        db.session.commit()
+        if not claimed:
+            return
+        job = db.session.get(ItineraryJob, job_id)
+
+        try:
+            trip = db.session.get(Trip, job.trip_id)
+            user = load_user(job.user_id)
+            result, _ = split_cached_flag(ItineraryGenerator().generate_itinerary(
+                **build_generator_inputs(trip, user), force_refresh=force_refresh
+            ))
+
+            trip.set_itinerary_data(result)
+            trip.ai_generated = True
+            trip.generation_model = result.get("model_used")
+            job.result = json.dumps(result)
+            job.status = "succeeded"
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(ItineraryJob, job_id)
+            job.status = "failed"
+            job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+
+itinerary_jobs = ItineraryJobQueue()
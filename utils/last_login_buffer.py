@@ -0,0 +1,101 @@
+import atexit
+import os
+import threading
+
+from flask import current_app
+from sqlalchemy import bindparam, or_
+
+from models import db, User
+
+LAST_LOGIN_FLUSH_INTERVAL = float(os.getenv("LAST_LOGIN_FLUSH_INTERVAL", 5))
+LAST_LOGIN_FLUSH_SIZE = int(os.getenv("LAST_LOGIN_FLUSH_SIZE", 500))
+
+_USERS = User.__table__
+
+
+class LastLoginBuffer:
+    """
+    Write-behind buffer for User.last_login.
+
+    Logins only record the timestamp in memory; a background thread writes
+    all pending timestamps in one transaction every `interval` seconds, or
+    sooner once `max_size` users are pending, and once more at shutdown.
+    A crash loses at most one interval of last_login updates.
+    """
+    def __init__(self, interval=LAST_LOGIN_FLUSH_INTERVAL, max_size=LAST_LOGIN_FLUSH_SIZE):
+        self.interval = interval
+        self.max_size = max_size
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._app = None
+
+    def init_app(self, app):
+        self._app = app
+
+    def record(self, user_id, when):
+        with self._lock:
+            # Keep only the latest login per user; earlier ones would be overwritten anyway.
+            if user_id not in self._pending or self._pending[user_id] < when:
+                self._pending[user_id] = when
+            size = len(self._pending)
+            if self._thread is None:
+                self._start()
+        if size >= self.max_size:
+            self._wake.set()
+
+    def _start(self):
+        if self._app is None:
+            self._app = current_app._get_current_object()
+        self._thread = threading.Thread(target=self._loop, name="last-login-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Keep the flusher alive; the next flush retries what is still pending.
+                self._app.logger.exception("Error flushing last_login updates")
+
+    def flush(self):
+        """Writes all pending timestamps now. Returns the number of users updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        statement = (
+            _USERS.update()
+            .where(_USERS.c.id == bindparam("user_id"))
+            .where(or_(_USERS.c.last_login.is_(None), _USERS.c.last_login < bindparam("when")))
+            .values(last_login=bindparam("when"))
+        )
+        try:
+            with self._app.app_context(), db.engine.begin() as connection:
+                connection.execute(statement, [
+                    {"user_id": user_id, "when": when} for user_id, when in pending.items()
+                ])
+        except Exception:
+            with self._lock:
+                for user_id, when in pending.items():
+                    if user_id not in self._pending or self._pending[user_id] < when:
+                        self._pending[user_id] = when
+            raise
+        return len(pending)
+
+    def stop(self):
+        """Stops the flusher and writes whatever is still pending."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+        if self._app is not None:
+            self.flush()
+
+
+last_login_buffer = LastLoginBuffer()
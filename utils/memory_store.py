@@ -0,0 +1,55 @@
+import itertools
+import threading
+
+
+class InMemoryStore:
+    """
+    Thread-safe in-memory repository for users and their trips.
+
+    Users are indexed by email and by id, so lookups are O(1) regardless of
+    how many users are registered. Ids come from a counter that is only ever
+    advanced under the lock, so concurrent registrations never collide.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self._users_by_email = {}
+        self._users_by_id = {}
+        self._trips = {}
+
+    def __len__(self):
+        return len(self._users_by_id)
+
+    # --- Users ---
+
+    def find_user_by_email(self, email):
+        # A single dict read is atomic under the GIL, so no lock is needed.
+        return self._users_by_email.get(email)
+
+    def find_user_by_id(self, user_id):
+        return self._users_by_id.get(user_id)
+
+    def add_user(self, email, password):
+        """Creates a user, or returns None if the email is already taken."""
+        with self._lock:
+            if email in self._users_by_email:
+                return None
+            user = {"id": next(self._ids), "email": email, "password": password}
+            self._users_by_email[email] = user
+            self._users_by_id[user["id"]] = user
+            self._trips[email] = []
+            return user
+
+    # --- Trips ---
+
+    def get_trips(self, email):
+        """Returns a snapshot of the user's trips that is safe to serialize."""
+        with self._lock:
+            return list(self._trips.get(email, []))
+
+    def set_trips_if_empty(self, email, default_trips):
+        """Seeds the user's trips unless another request already has."""
+        with self._lock:
+            if not self._trips.get(email):
+                self._trips[email] = list(default_trips)
+            return list(self._trips[email])
@@ -0,0 +1,274 @@
+"""
+Request instrumentation and Prometheus-format metrics.
+
+init_metrics(app) times every request and splits its wall time into phases:
+"db" (SQL execution), "upstream" (geocoding, Open-Meteo, Gemini), "transform"
+(forecast pandas/numpy work), "serialize" (JSON encoding and compression) and
+"other" (the rest). Call sites report through timed(), upstream_call() and
+record_cache(); outside a request only the process-wide metrics are updated.
+Work fanned out to threads (see propagate) counts in full, so phases can add
+up to more than the wall time.
+
+The text exposition is served by routes/metrics_routes.py. Requests slower
+than SLOW_REQUEST_SECONDS are logged with their breakdown at
+SLOW_REQUEST_SAMPLE_RATE to the "justgo.slow_requests" logger.
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter as _Tally, defaultdict
+from contextlib import contextmanager
+
+from flask import g, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", 1.0))
+SLOW_REQUEST_SAMPLE_RATE = float(os.getenv("SLOW_REQUEST_SAMPLE_RATE", 0.0))
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+PHASES = ("db", "upstream", "transform", "serialize", "other")
+
+slow_request_log = logging.getLogger("justgo.slow_requests")
+
+
+# --- Metric types ---
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}"
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = sorted((labels, (list(b), s, c)) for labels, (b, s, c) in self._series.items())
+        for labels, (buckets, total, count) in series:
+            cumulative = 0
+            for bound, n in zip(self.buckets, buckets):
+                cumulative += n
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', f'{bound:g}')])} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', '+Inf')])} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total:g}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+REQUEST_SECONDS = Histogram(
+    "justgo_http_request_duration_seconds", "Request wall time.", ("method", "endpoint", "status"))
+PHASE_SECONDS = Histogram(
+    "justgo_http_request_phase_seconds", "Request wall time spent per phase.", ("endpoint", "phase"))
+DB_QUERIES = Histogram(
+    "justgo_http_request_db_queries", "SQL statements executed per request.", ("endpoint",), COUNT_BUCKETS)
+UPSTREAM_CALLS = Histogram(
+    "justgo_http_request_upstream_calls", "Upstream API calls per request.", ("endpoint",), COUNT_BUCKETS)
+UPSTREAM_SECONDS = Histogram(
+    "justgo_upstream_request_duration_seconds", "Upstream API call latency.", ("service", "outcome"))
+CACHE_LOOKUPS = Counter(
+    "justgo_cache_lookups_total", "Cache lookups by cache and result (hit/miss).", ("cache", "result"))
+
+REGISTRY = [REQUEST_SECONDS, PHASE_SECONDS, DB_QUERIES, UPSTREAM_CALLS, UPSTREAM_SECONDS, CACHE_LOOKUPS]
+
+
+def render():
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    return "\n".join(line for metric in REGISTRY for line in metric.collect()) + "\n"
+
+
+# --- Per-request accounting ---
+
+class RequestMetrics:
+    """Phase durations and counters for one request; shared with threads it fans out to."""
+    def __init__(self):
+        self.phases = defaultdict(float)
+        self.db_queries = 0
+        self.upstream = []
+        self.cache = _Tally()
+        self._lock = threading.Lock()
+
+    def add_phase(self, phase, seconds):
+        with self._lock:
+            self.phases[phase] += seconds
+
+
+_current = contextvars.ContextVar("justgo_request_metrics", default=None)
+
+
+def propagate(fn):
+    """Wraps fn so calls from worker threads are accounted to the current request."""
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+@contextmanager
+def timed(phase):
+    """Adds the block's duration to `phase` of the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_phase(phase, time.perf_counter() - start)
+
+
+@contextmanager
+def upstream_call(service):
+    """Times one call to an external API, per request and process-wide."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - start
+        UPSTREAM_SECONDS.observe(elapsed, service, outcome)
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.add_phase("upstream", elapsed)
+            with metrics._lock:
+                metrics.upstream.append((service, round(elapsed, 4), outcome))
+
+
+def record_cache(cache, hit):
+    result = "hit" if hit else "miss"
+    CACHE_LOOKUPS.inc(cache, result)
+    metrics = _current.get()
+    if metrics is not None:
+        with metrics._lock:
+            metrics.cache[f"{cache}_{result}"] += 1
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("justgo_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = _current.get()
+    starts = conn.info.get("justgo_query_start")
+    if metrics is None or not starts:
+        return
+    metrics.add_phase("db", time.perf_counter() - starts.pop())
+    with metrics._lock:
+        metrics.db_queries += 1
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, with encoding time accounted to the "serialize" phase."""
+    def dumps(self, obj, **kwargs):
+        with timed("serialize"):
+            return super().dumps(obj, **kwargs)
+
+
+# --- Middleware ---
+
+def _endpoint():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def _start_request():
+    g._metrics_start = time.perf_counter()
+    _current.set(RequestMetrics())
+
+
+def _finish_request(response):
+    metrics = _current.get()
+    start = g.pop("_metrics_start", None)
+    if metrics is None or start is None:
+        return response
+    total = time.perf_counter() - start
+    endpoint = _endpoint()
+
+    phases = dict(metrics.phases)
+    phases["other"] = max(0.0, total - sum(phases.values()))
+    REQUEST_SECONDS.observe(total, request.method, endpoint, str(response.status_code))
+    for phase in PHASES:
+        PHASE_SECONDS.observe(phases.get(phase, 0.0), endpoint, phase)
+    DB_QUERIES.observe(metrics.db_queries, endpoint)
+    UPSTREAM_CALLS.observe(len(metrics.upstream), endpoint)
+
+    if total >= SLOW_REQUEST_SECONDS and random.random() < SLOW_REQUEST_SAMPLE_RATE:
+        slow_request_log.warning(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "endpoint": endpoint,
+            "status": response.status_code,
+            "seconds": round(total, 4),
+            "phases": {phase: round(seconds, 4) for phase, seconds in phases.items()},
+            "db_queries": metrics.db_queries,
+            "upstream": metrics.upstream,
+            "cache": dict(metrics.cache),
+        }))
+    return response
+
+
+def _teardown_request(exc):
+    # Threads are reused by some servers; don't leak this request's metrics into the next.
+    _current.set(None)
+
+
+def init_metrics(app):
+    """Installs the timing middleware and the timed JSON provider on the app."""
+    app.json = TimedJSONProvider(app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
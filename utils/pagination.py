@@ -0,0 +1,69 @@
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, tuple_
+
+
+def encode_cursor(sort_by, sort_order, value, row_id):
+    """Builds an opaque cursor pointing just after the row with (value, row_id)."""
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    raw = json.dumps({"s": sort_by, "o": sort_order, "v": value, "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort_by, sort_order, column):
+    """
+    Returns the (value, row_id) stored in a cursor.
+
+    Raises ValueError if the cursor is malformed or was issued for a
+    different sort, since following it would skip or repeat rows.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        value, row_id = data["v"], int(data["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if data.get("s") != sort_by or data.get("o") != sort_order:
+        raise ValueError("Cursor does not match sort_by/sort_order")
+
+    if value is not None:
+        if isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        elif isinstance(column.type, Date):
+            value = date.fromisoformat(value)
+    return value, row_id
+
+
+def keyset_page(query, column, id_column, sort_by, sort_order, per_page, cursor=None, row_key=None):
+    """
+    Fetches one page ordered by (column, id) without OFFSET or COUNT.
+
+    Seeks past the cursor with a row-value comparison, which an index on
+    (..., column, id) answers directly. Returns (rows, next_cursor); next_cursor
+    is None on the last page. `row_key(row)` returns a row's (value, id) when
+    they are not plain attributes of it, e.g. for computed columns.
+    """
+    descending = sort_order == "desc"
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort_by, sort_order, column)
+        key = tuple_(column, id_column)
+        query = query.filter(key < (value, row_id) if descending else key > (value, row_id))
+
+    if descending:
+        query = query.order_by(column.desc(), id_column.desc())
+    else:
+        query = query.order_by(column.asc(), id_column.asc())
+
+    # One extra row tells us whether another page exists.
+    rows = query.limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    if row_key is None:
+        value, row_id = getattr(rows[-1], column.key), getattr(rows[-1], id_column.key)
+    else:
+        value, row_id = row_key(rows[-1])
+    return rows, encode_cursor(sort_by, sort_order, value, row_id)
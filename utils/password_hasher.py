@@ -0,0 +1,100 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 16))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 10))
+
+
+class HasherBusyError(Exception):
+    """Raised when too many hashes are already queued or one times out; the caller should answer 503."""
+
+
+class PasswordHasher:
+    """
+    Runs werkzeug's password hashing in a bounded process pool.
+
+    Hashing is deliberately slow and holds the GIL, so doing it in request
+    threads stalls every other endpoint during a login burst. At most
+    `workers + max_queue` hashes may be in flight; beyond that calls fail
+    fast with HasherBusyError instead of queueing without limit.
+    workers=0 hashes inline.
+    """
+    def __init__(self, method=PASSWORD_HASH_METHOD, workers=PASSWORD_HASH_WORKERS,
+                 max_queue=PASSWORD_HASH_MAX_QUEUE, timeout=PASSWORD_HASH_TIMEOUT):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers else None
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+        self._method_prefix = None
+
+    def _executor(self):
+        # A pool inherited through fork (gunicorn) has dead workers; start a fresh one.
+        pid = os.getpid()
+        if self._pool is None or self._pool_pid != pid:
+            with self._lock:
+                if self._pool is None or self._pool_pid != pid:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                    self._pool_pid = pid
+        return self._pool
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusyError("Too many password operations in progress, try again shortly")
+        try:
+            future = self._executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # The pool is backed up; the hash still finishes and frees its slot on its own.
+            raise HasherBusyError("Password operation timed out, try again shortly")
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made with different parameters than the configured method."""
+        if self._method_prefix is None:
+            # Werkzeug expands defaults ("scrypt" -> "scrypt:32768:8:1"), so compare
+            # against what it actually stores. Cheap enough with an empty password.
+            self._method_prefix = generate_password_hash("", self.method).split("$", 1)[0]
+        return password_hash.split("$", 1)[0] != self._method_prefix
+
+
+password_hasher = PasswordHasher()
+
+
+def configure(**kwargs):
+    """Replaces the shared hasher, e.g. to change workers or method at startup."""
+    global password_hasher
+    password_hasher = PasswordHasher(**kwargs)
+    return password_hasher
+
+
+def hash_password(password):
+    return password_hasher.hash(password)
+
+
+def verify_password(password_hash, password):
+    return password_hasher.verify(password_hash, password)
+
+
+def needs_rehash(password_hash):
+    return password_hasher.needs_rehash(password_hash)
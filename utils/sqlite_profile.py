@@ -0,0 +1,128 @@
+"""
+Production profile for a file SQLite database shared by several workers.
+
+Every connection gets WAL, synchronous=NORMAL, a memory map and a busy
+timeout. Plain SELECTs go through a pooled "reader" bind whose connections
+are query_only; everything else goes through the default bind, which holds
+a single connection and starts transactions with BEGIN IMMEDIATE. Writers
+in a process queue on that pool instead of racing each other for the lock,
+and writers in other processes wait out busy_timeout instead of failing
+with "database is locked".
+
+Use config.SQLiteProductionConfig, then call init_sqlite_profile(app, db)
+after db.init_app(app). Without a reader bind the session behaves exactly
+like the stock Flask-SQLAlchemy one.
+"""
+import os
+
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+READER_BIND = "reader"
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 16 * 1024))
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", 8))
+# How long a request waits in the in-process queue for the writer connection.
+SQLITE_WRITE_QUEUE_TIMEOUT = float(os.getenv("SQLITE_WRITE_QUEUE_TIMEOUT", 30))
+
+_WRITING = "sqlite_profile_writing"
+
+
+def _pragmas(readonly):
+    pragmas = [
+        ("synchronous", "NORMAL"),
+        ("busy_timeout", SQLITE_BUSY_TIMEOUT_MS),
+        ("mmap_size", SQLITE_MMAP_SIZE),
+        ("cache_size", -SQLITE_CACHE_SIZE_KB),
+        ("temp_store", "MEMORY"),
+    ]
+    if readonly:
+        pragmas.append(("query_only", "ON"))
+    else:
+        # Persistent in the database file; setting it from the writer is enough.
+        pragmas.insert(0, ("journal_mode", "WAL"))
+    return pragmas
+
+
+def writer_engine_options():
+    """Engine options for the default bind: one pooled connection, waited on in a queue."""
+    return {
+        "pool_size": 1,
+        "max_overflow": 0,
+        "pool_timeout": SQLITE_WRITE_QUEUE_TIMEOUT,
+        "connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000, "check_same_thread": False},
+    }
+
+
+def reader_engine_options():
+    return {
+        "pool_size": SQLITE_READ_POOL_SIZE,
+        "max_overflow": 0,
+        "pool_timeout": SQLITE_WRITE_QUEUE_TIMEOUT,
+        "connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000, "check_same_thread": False},
+    }
+
+
+def install_sqlite_pragmas(engine, readonly=False):
+    """Applies the profile pragmas to every new connection of `engine`."""
+    pragmas = _pragmas(readonly)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+        if not readonly:
+            # Let SQLAlchemy emit BEGIN itself (below) instead of pysqlite's deferred BEGIN.
+            dbapi_connection.isolation_level = None
+
+    if not readonly:
+        @event.listens_for(engine, "begin")
+        def _on_begin(connection):
+            # Take the write lock up front: a deferred transaction that later
+            # writes can fail with SQLITE_BUSY without waiting for busy_timeout.
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def init_sqlite_profile(app, db):
+    """Installs the pragmas on the app's SQLite engines and switches the database to WAL."""
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name == "sqlite":
+                install_sqlite_pragmas(engine, readonly=key == READER_BIND)
+        if db.engine.dialect.name == "sqlite":
+            with db.engine.connect():
+                pass
+
+
+class RoutingSession(Session):
+    """
+    Sends reads to the reader bind and everything else to the default bind.
+
+    Once a transaction has touched the writer (a flush, an UPDATE, raw SQL),
+    reads stay on the writer until it ends, so the session always sees its
+    own uncommitted changes.
+    """
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and isinstance(clause, Select) and not self._flushing and not self.info.get(_WRITING):
+            reader = self._db.engines.get(READER_BIND)
+            if reader is not None:
+                return reader
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_begin")
+def _mark_writing(session, transaction, connection):
+    reader = session._db.engines.get(READER_BIND)
+    if reader is not None and connection.engine is not reader:
+        session.info[_WRITING] = True
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _clear_writing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_WRITING, None)
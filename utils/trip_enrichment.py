@@ -0,0 +1,146 @@
+"""
+Fills in a trip's coordinates, weather summary and itinerary concurrently.
+
+The upstream helpers are blocking (requests), so the pipeline runs them from
+asyncio on one small thread pool per upstream: the pool size is that
+upstream's concurrency limit across all requests in the process, and each
+call gets its own timeout. Geocoding has to finish before the weather fetch,
+but the itinerary does not depend on either, so a trip costs roughly
+max(itinerary, geocode + weather) instead of the sum. A failed or timed-out
+part is reported and left unchanged; the rest is written in one transaction.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from models import db, Trip
+from utils.itinerary_ai import ItineraryGenerator, split_cached_flag
+from utils.itinerary_jobs import build_generator_inputs
+from utils.metrics import propagate
+from utils.user_cache import load_user
+from weather_routes import get_coordinates, get_weather_data, stored_summary
+
+PARTS = ("coordinates", "weather", "itinerary")
+
+# Seconds each upstream call may take, and how many may run at once per process.
+# The itinerary timeout is also passed to the Gemini request (overriding GEMINI_TIMEOUT).
+ENRICH_TIMEOUTS = {
+    "geocode": float(os.getenv("ENRICH_GEOCODE_TIMEOUT", 10)), # the Geocoding request timeout
+    "weather": float(os.getenv("ENRICH_WEATHER_TIMEOUT", 10)),
+    "itinerary": float(os.getenv("ENRICH_ITINERARY_TIMEOUT", 45)),
+}
+ENRICH_CONCURRENCY = {
+    "geocode": int(os.getenv("ENRICH_GEOCODE_CONCURRENCY", 8)),
+    "weather": int(os.getenv("ENRICH_WEATHER_CONCURRENCY", 8)),
+    "itinerary": int(os.getenv("ENRICH_ITINERARY_CONCURRENCY", 4)),
+}
+
+
+class TripEnricher:
+    def __init__(self, timeouts=None, concurrency=None):
+        self.timeouts = dict(ENRICH_TIMEOUTS, **(timeouts or {}))
+        concurrency = dict(ENRICH_CONCURRENCY, **(concurrency or {}))
+        self._pools = {
+            upstream: ThreadPoolExecutor(max_workers=n, thread_name_prefix=f"enrich-{upstream}")
+            for upstream, n in concurrency.items()
+        }
+
+    async def _call(self, upstream, fn, *args):
+        """Runs fn on the upstream's pool; raises asyncio.TimeoutError after its timeout."""
+        loop = asyncio.get_running_loop()
+        # The timeout abandons the call; the thread finishes on its own (requests has its own timeouts).
+        return await asyncio.wait_for(
+            loop.run_in_executor(self._pools[upstream], propagate(fn), *args), self.timeouts[upstream]
+        )
+
+    async def _coordinates_and_weather(self, spec, report):
+        coords = spec["coords"]
+        if "coordinates" in spec["parts"]:
+            coords = await self._part(report, "coordinates", "geocode", get_coordinates, spec["city"], spec["country"])
+        if "weather" in spec["parts"]:
+            if coords is None:
+                report["weather"] = {"status": "skipped", "error": "No coordinates"}
+                return coords, None
+            summary = await self._part(
+                report, "weather", "weather", get_weather_data, *coords, spec["start_date"], spec["duration"], "summary"
+            )
+            return coords, summary
+        return coords, None
+
+    async def _part(self, report, part, upstream, fn, *args):
+        """Runs one part; a failure is recorded in `report` and returns None."""
+        start = time.perf_counter()
+        result = None
+        try:
+            result = await self._call(upstream, fn, *args)
+            outcome = {"status": "ok"}
+        except asyncio.TimeoutError:
+            outcome = {"status": "timeout", "error": f"{upstream} took longer than {self.timeouts[upstream]}s"}
+        except Exception as e:
+            outcome = {"status": "failed", "error": str(e)}
+        outcome["seconds"] = round(time.perf_counter() - start, 3)
+        report[part] = outcome
+        return result
+
+    async def _run(self, spec):
+        report = {}
+        tasks = [self._coordinates_and_weather(spec, report)]
+        if "itinerary" in spec["parts"]:
+            tasks.append(self._part(
+                report, "itinerary", "itinerary",
+                # Gemini's own timeout matches ours, so a timed-out call frees its pool thread too.
+                lambda: ItineraryGenerator(timeout=self.timeouts["itinerary"]).generate_itinerary(
+                    **spec["itinerary_inputs"], force_refresh=spec["force"]
+                ),
+            ))
+        results = await asyncio.gather(*tasks)
+        (coords, summary), itinerary = results[0], (results[1] if len(results) > 1 else None)
+        return report, coords, summary, itinerary
+
+    def enrich(self, trip, parts=PARTS, force=False):
+        """
+        Enriches `trip` and commits. Returns {part: {"status", "seconds", "error"?}};
+        a generated itinerary's entry also says whether it came from the cache.
+
+        Without force, coordinates and itinerary the trip already has are kept
+        (the stored coordinates are still used for the weather fetch).
+        Must be called from a thread without a running event loop.
+        """
+        trip_id = trip.id
+        parts = [part for part in parts if part in PARTS]
+        if not force:
+            if trip.latitude is not None and trip.longitude is not None:
+                parts = [part for part in parts if part != "coordinates"]
+            if trip.itinerary_data:
+                parts = [part for part in parts if part != "itinerary"]
+        spec = {
+            "parts": parts,
+            "force": force,
+            "city": trip.destination_city,
+            "country": trip.destination_country,
+            "coords": (trip.latitude, trip.longitude) if trip.latitude is not None else None,
+            "start_date": trip.start_date,
+            "duration": trip.duration,
+            "itinerary_inputs": build_generator_inputs(trip, load_user(trip.user_id)) if "itinerary" in parts else None,
+        }
+        # The session is idle while the upstream calls run; release its connection meanwhile.
+        db.session.commit()
+
+        report, coords, summary, itinerary = asyncio.run(self._run(spec))
+
+        trip = db.session.get(Trip, trip_id)
+        if "coordinates" in parts and coords is not None:
+            trip.latitude, trip.longitude = coords
+        if summary is not None:
+            trip.set_weather_data(stored_summary(summary))
+        if itinerary is not None:
+            itinerary, report["itinerary"]["cached"] = split_cached_flag(itinerary)
+            trip.set_itinerary_data(itinerary)
+            trip.ai_generated = True
+            trip.generation_model = itinerary.get("model_used")
+        db.session.commit()
+        return report
+
+
+trip_enricher = TripEnricher()
@@ -0,0 +1,135 @@
+import re
+import sqlite3
+
+from flask import current_app
+from sqlalchemy import column, event, select, table, text
+from sqlalchemy.exc import OperationalError
+
+from models import Trip
+
+# Standalone FTS5 index over the searchable trip fields, keyed by rowid = trips.id.
+# The itinerary column holds the generated text, not the raw JSON blob.
+FTS_TABLE = table("trips_fts", column("rowid"), column("rank"))
+
+_ITINERARY_TEXT = (
+    "CASE WHEN json_valid({row}.itinerary_data) "
+    "THEN json_extract({row}.itinerary_data, '$.itinerary_text') END"
+)
+
+_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS trips_fts USING fts5("
+    "title, destination_city, destination_country, itinerary, tokenize='unicode61 remove_diacritics 2')",
+    f"""CREATE TRIGGER IF NOT EXISTS trips_fts_insert AFTER INSERT ON trips BEGIN
+        INSERT INTO trips_fts (rowid, title, destination_city, destination_country, itinerary)
+        VALUES (new.id, new.title, new.destination_city, new.destination_country,
+                {_ITINERARY_TEXT.format(row="new")});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trips_fts_update
+    AFTER UPDATE OF title, destination_city, destination_country, itinerary_data ON trips BEGIN
+        DELETE FROM trips_fts WHERE rowid = old.id;
+        INSERT INTO trips_fts (rowid, title, destination_city, destination_country, itinerary)
+        VALUES (new.id, new.title, new.destination_city, new.destination_country,
+                {_ITINERARY_TEXT.format(row="new")});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trips_fts_delete AFTER DELETE ON trips BEGIN
+        DELETE FROM trips_fts WHERE rowid = old.id;
+    END""",
+]
+
+_BACKFILL = f"""
+    INSERT INTO trips_fts (rowid, title, destination_city, destination_country, itinerary)
+    SELECT id, title, destination_city, destination_country, {_ITINERARY_TEXT.format(row="trips")}
+    FROM trips WHERE id NOT IN (SELECT rowid FROM trips_fts)
+"""
+
+_available = {}
+
+
+def install_trip_search(connection):
+    """
+    Creates the FTS5 table and its sync triggers, then indexes existing trips.
+
+    Idempotent. Returns False, leaving the database untouched, when it is not
+    SQLite or SQLite was built without FTS5; searches then use LIKE.
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+    try:
+        for statement in _DDL:
+            connection.execute(text(statement))
+    except OperationalError as e:
+        if "fts5" in str(e):
+            return False
+        raise
+    connection.execute(text(_BACKFILL))
+    return True
+
+
+@event.listens_for(Trip.__table__, "after_create")
+def _install_after_create(target, connection, **kw):
+    _available[connection.engine.url] = install_trip_search(connection)
+
+
+def enable_trip_search(engine):
+    """
+    Installs the index on a database whose trips table already existed.
+
+    New databases get it from create_all; existing ones need this once (see
+    `flask trips install-search`). Returns whether FTS5 search is now on.
+    """
+    with engine.begin() as connection:
+        _available[engine.url] = install_trip_search(connection)
+    return _available[engine.url]
+
+
+def fts_available(session):
+    """Whether the session's database has the trips_fts index (checked once per engine)."""
+    engine = session.get_bind()
+    if engine.url not in _available:
+        if engine.dialect.name != "sqlite":
+            _available[engine.url] = False
+        else:
+            found = session.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'trips_fts'"
+            )).first()
+            _available[engine.url] = found is not None
+            if found is None:
+                current_app.logger.warning(
+                    "trips_fts is missing, so trip search falls back to LIKE; run `flask trips install-search`"
+                )
+    return _available[engine.url]
+
+
+def match_expression(search):
+    """Turns free text into an FTS5 query: every word must match, as a prefix."""
+    words = re.findall(r"\w+", search)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def apply_search(query, search, session):
+    """
+    Filters a Trip query by free-text search.
+
+    Returns (query, rank_column). rank_column is FTS5's bm25 rank (lower is
+    more relevant) to order by, or None when the LIKE fallback was used.
+    """
+    expression = match_expression(search) if fts_available(session) else ""
+    if expression:
+        matches = select(FTS_TABLE.c.rowid.label("trip_id"), FTS_TABLE.c.rank.label("rank")).where(
+            text("trips_fts MATCH :trip_search").bindparams(trip_search=expression)
+        ).cte("trip_matches")
+        # Joined directly, SQLite drives the join from the user_id index and runs
+        # the MATCH once per trip; materializing runs the full-text query once.
+        if sqlite3.sqlite_version_info >= (3, 35):
+            matches = matches.prefix_with("MATERIALIZED")
+        query = query.join(matches, matches.c.trip_id == Trip.id)
+        return query, matches.c.rank
+
+    # LIKE fallback: no FTS5 index, or the search has no words (e.g. only punctuation).
+    search_term = f"%{search}%"
+    query = query.filter(
+        (Trip.title.like(search_term)) |
+        (Trip.destination_city.like(search_term)) |
+        (Trip.destination_country.like(search_term))
+    )
+    return query, None
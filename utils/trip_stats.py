@@ -0,0 +1,232 @@
+from collections import Counter, defaultdict
+from datetime import date
+
+from sqlalchemy import case, event, func, select
+
+from models import db, Trip, User, UserBudgetTotal, UserTripStats
+
+# Trip.status -> the UserTripStats counter it contributes to.
+STATUS_COLUMNS = {"planned": "upcoming_trips", "active": "active_trips", "completed": "completed_trips"}
+COUNT_COLUMNS = ("total_trips", "upcoming_trips", "active_trips", "completed_trips")
+
+_TRIPS = Trip.__table__
+_STATS = UserTripStats.__table__
+_BUDGETS = UserBudgetTotal.__table__
+
+
+class _Deltas:
+    def __init__(self):
+        self.counts = defaultdict(Counter)
+        self.budgets = defaultdict(float)
+
+    def add(self, user_id, status, amount, currency, sign):
+        if user_id is None:
+            return
+        self.counts[user_id]["total_trips"] += sign
+        column = STATUS_COLUMNS.get(status or "planned")
+        if column:
+            self.counts[user_id][column] += sign
+        if amount:
+            self.budgets[(user_id, currency or "USD")] += sign * amount
+
+    def discard(self, user_id):
+        self.counts.pop(user_id, None)
+        for key in [key for key in self.budgets if key[0] == user_id]:
+            del self.budgets[key]
+
+
+def _values(trip):
+    return trip.user_id, trip.status, trip.budget_amount, trip.budget_currency
+
+
+def _before_flush(session, flush_context, instances):
+    """Snapshots the stored stats-relevant columns of trips about to change."""
+    changed = [
+        obj.id for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, Trip) and obj.id is not None
+    ]
+    old = {}
+    if changed:
+        rows = session.connection().execute(
+            select(_TRIPS.c.id, _TRIPS.c.user_id, _TRIPS.c.status, _TRIPS.c.budget_amount,
+                   _TRIPS.c.budget_currency).where(_TRIPS.c.id.in_(changed))
+        )
+        old = {row[0]: tuple(row[1:]) for row in rows}
+    session.info["trip_stats_old"] = old
+
+    deleted_users = [obj.id for obj in session.deleted if isinstance(obj, User) and obj.id is not None]
+    # Their stats rows go away here; _after_flush must not re-create them from the cascaded trip deletes.
+    session.info["trip_stats_deleted_users"] = set(deleted_users)
+    if deleted_users:
+        connection = session.connection()
+        connection.execute(_STATS.delete().where(_STATS.c.user_id.in_(deleted_users)))
+        connection.execute(_BUDGETS.delete().where(_BUDGETS.c.user_id.in_(deleted_users)))
+
+
+def _after_flush(session, flush_context):
+    """Applies the flushed trip changes to the stats tables in the same transaction."""
+    old = session.info.pop("trip_stats_old", {})
+    deleted_users = session.info.pop("trip_stats_deleted_users", set())
+    deltas = _Deltas()
+    for obj in session.new:
+        if isinstance(obj, Trip):
+            deltas.add(*_values(obj), 1)
+    for obj in session.dirty:
+        if isinstance(obj, Trip) and obj.id in old and old[obj.id] != _values(obj):
+            deltas.add(*old[obj.id], -1)
+            deltas.add(*_values(obj), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Trip) and obj.id in old:
+            deltas.add(*old[obj.id], -1)
+    for user_id in deleted_users:
+        deltas.discard(user_id)
+    apply_deltas(session.connection(), deltas)
+
+
+def apply_deltas(connection, deltas):
+    """
+    Adds the deltas to the stats rows with atomic col = col + n updates.
+
+    A missing row is only created from a delta that adds; one that takes away
+    from a row that isn't there would store negative stats (a missing row
+    means zero), so it is dropped.
+    """
+    for user_id, counts in deltas.counts.items():
+        counts = {column: n for column, n in counts.items() if n}
+        if not counts:
+            continue
+        updated = connection.execute(
+            _STATS.update().where(_STATS.c.user_id == user_id)
+            .values({column: _STATS.c[column] + n for column, n in counts.items()})
+        ).rowcount
+        if not updated and all(n > 0 for n in counts.values()):
+            connection.execute(_STATS.insert().values(
+                user_id=user_id, **{column: counts.get(column, 0) for column in COUNT_COLUMNS}
+            ))
+
+    for (user_id, currency), amount in deltas.budgets.items():
+        if not amount:
+            continue
+        condition = (_BUDGETS.c.user_id == user_id) & (_BUDGETS.c.currency == currency)
+        updated = connection.execute(
+            _BUDGETS.update().where(condition).values(total_amount=_BUDGETS.c.total_amount + amount)
+        ).rowcount
+        if not updated and amount > 0:
+            connection.execute(_BUDGETS.insert().values(user_id=user_id, currency=currency, total_amount=amount))
+
+
+def apply_inserted_rows(connection, rows):
+    """Counts trips inserted with Core (dicts of column values), which bypass the flush hooks."""
+    deltas = _Deltas()
+    for row in rows:
+        deltas.add(row["user_id"], row["status"], row["budget_amount"], row["budget_currency"], 1)
+    apply_deltas(connection, deltas)
+
+
+event.listen(db.session, "before_flush", _before_flush)
+event.listen(db.session, "after_flush", _after_flush)
+
+
+def get_user_stats(user_id):
+    """Returns the dashboard stats for a user without scanning their trips."""
+    stats = db.session.get(UserTripStats, user_id)
+    data = stats.to_dict() if stats else {column: 0 for column in COUNT_COLUMNS}
+    budgets = UserBudgetTotal.query.filter_by(user_id=user_id).all()
+    data["total_budget"] = {budget.currency: budget.total_amount for budget in budgets if budget.total_amount}
+    return data
+
+
+def sweep_trip_statuses(today=None, batch_size=500):
+    """
+    Moves trips whose dates have passed to their new status.
+
+    planned -> active once the trip starts, and planned/active -> completed
+    once it has ended. Runs through the ORM so the stats follow; run it at
+    least daily (see `flask trips sweep-statuses`). Returns the number of
+    trips changed.
+    """
+    today = today or date.today()
+    new_status = case(
+        (Trip.end_date < today, "completed"),
+        else_="active",
+    )
+    changed = 0
+    while True:
+        trips = (
+            Trip.query.filter(
+                ((Trip.status == "planned") & (Trip.start_date <= today)) |
+                ((Trip.status == "active") & (Trip.end_date < today))
+            )
+            .add_columns(new_status.label("new_status"))
+            .limit(batch_size)
+            .all()
+        )
+        if not trips:
+            return changed
+        for trip, status in trips:
+            trip.status = status
+        db.session.commit()
+        changed += len(trips)
+
+
+def rebuild_trip_stats(check_only=False):
+    """
+    Recomputes every user's stats from the trips table.
+
+    Returns the user ids whose stored stats were wrong. Unless check_only is
+    set, the stats tables are replaced with the recomputed values.
+    """
+    counts = {
+        row.user_id: {column: int(getattr(row, column) or 0) for column in COUNT_COLUMNS}
+        for row in db.session.execute(
+            select(
+                _TRIPS.c.user_id,
+                func.count().label("total_trips"),
+                *[
+                    func.sum(case((func.coalesce(_TRIPS.c.status, "planned") == status, 1), else_=0)).label(column)
+                    for status, column in STATUS_COLUMNS.items()
+                ],
+            ).group_by(_TRIPS.c.user_id)
+        )
+    }
+    budgets = defaultdict(dict)
+    for user_id, currency, amount in db.session.execute(
+        select(_TRIPS.c.user_id, func.coalesce(_TRIPS.c.budget_currency, "USD"), func.sum(_TRIPS.c.budget_amount))
+        .where(_TRIPS.c.budget_amount.isnot(None))
+        .group_by(_TRIPS.c.user_id, func.coalesce(_TRIPS.c.budget_currency, "USD"))
+    ):
+        if amount:
+            budgets[user_id][currency] = amount
+
+    stored_counts = {
+        row.user_id: {column: getattr(row, column) for column in COUNT_COLUMNS}
+        for row in db.session.execute(select(_STATS))
+    }
+    stored_budgets = defaultdict(dict)
+    for row in db.session.execute(select(_BUDGETS)):
+        if row.total_amount:
+            stored_budgets[row.user_id][row.currency] = row.total_amount
+
+    zero = {column: 0 for column in COUNT_COLUMNS}
+    mismatched = sorted(
+        user_id for user_id in set(counts) | set(stored_counts) | set(budgets) | set(stored_budgets)
+        if counts.get(user_id, zero) != stored_counts.get(user_id, zero)
+        or any(
+            abs(budgets[user_id].get(c, 0) - stored_budgets[user_id].get(c, 0)) > 1e-6
+            for c in set(budgets[user_id]) | set(stored_budgets[user_id])
+        )
+    )
+
+    if not check_only:
+        db.session.execute(_STATS.delete())
+        db.session.execute(_BUDGETS.delete())
+        if counts:
+            db.session.execute(_STATS.insert(), [{"user_id": u, **c} for u, c in counts.items()])
+        rows = [
+            {"user_id": u, "currency": c, "total_amount": a}
+            for u, by_currency in budgets.items() for c, a in by_currency.items()
+        ]
+        if rows:
+            db.session.execute(_BUDGETS.insert(), rows)
+        db.session.commit()
+    return mismatched
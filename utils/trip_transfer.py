@@ -0,0 +1,291 @@
+"""
+Bulk trip export and import as NDJSON (one trip object per line).
+
+Export streams a user's trips in id order from a single cursor, fetching
+TRIP_EXPORT_BATCH rows at a time, so memory stays flat however many trips
+there are. Lines have the shape of Trip.to_dict(include_detailed=True) plus
+updated_at, which is also what import accepts.
+
+Import reads the body line by line, validates each row and inserts valid
+rows TRIP_IMPORT_CHUNK_SIZE at a time with Core executemany, one commit per
+chunk. The TripImport progress row and the dashboard stats are updated in
+that same commit, so after an interruption the client re-sends the body
+with the same import_id (or only the remaining lines, with offset) and
+nothing is inserted twice.
+"""
+import io
+import json
+import math
+import os
+import uuid
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+from models import db, Trip, TripImport
+from utils.trip_stats import STATUS_COLUMNS, apply_inserted_rows
+
+TRIP_EXPORT_BATCH = int(os.getenv("TRIP_EXPORT_BATCH", 1000))
+TRIP_IMPORT_CHUNK_SIZE = int(os.getenv("TRIP_IMPORT_CHUNK_SIZE", 1000))
+TRIP_IMPORT_MAX_BYTES = int(os.getenv("TRIP_IMPORT_MAX_BYTES", 2 * 1024 ** 3))
+TRIP_IMPORT_MAX_LINE = int(os.getenv("TRIP_IMPORT_MAX_LINE", 1024 * 1024))
+# Rejected rows reported back per request; the rest are only counted.
+TRIP_IMPORT_MAX_ERRORS = 100
+
+_TRIPS = Trip.__table__
+_IMPORTS = TripImport.__table__
+
+
+class ImportConflict(Exception):
+    """The import_id belongs to someone else, or the body doesn't line up with the stored progress."""
+
+
+# --- Export ---
+
+def _export_line(row, include_blobs):
+    data = {
+        "id": row.id,
+        "title": row.title,
+        "destination_city": row.destination_city,
+        "destination_country": row.destination_country,
+        "latitude": row.latitude,
+        "longitude": row.longitude,
+        "start_date": row.start_date.isoformat(),
+        "end_date": row.end_date.isoformat(),
+        "duration": row.duration,
+        "status": row.status,
+        "travel_style": row.travel_style,
+        "budget": {"amount": row.budget_amount, "currency": row.budget_currency},
+        "ai_generated": row.ai_generated,
+        "generation_model": row.generation_model,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+    }
+    # The JSON columns already hold JSON text: splice it in rather than parsing and re-encoding it.
+    raw = [("interests", row.interests or "[]")]
+    if include_blobs:
+        raw += [("itinerary", row.itinerary_data or "null"), ("weather", row.weather_data or "null")]
+    return json.dumps(data)[:-1] + "".join(f', "{key}": {value}' for key, value in raw) + "}\n"
+
+
+def export_trips(user_id, include_blobs=True, after_id=None, batch_size=TRIP_EXPORT_BATCH):
+    """
+    Yields the user's trips as NDJSON text, one chunk per `batch_size` rows.
+
+    after_id resumes an interrupted export after the last id received.
+    """
+    columns = [column for column in _TRIPS.c
+               if include_blobs or column.name not in ("itinerary_data", "weather_data")]
+    stmt = select(*columns).where(_TRIPS.c.user_id == user_id).order_by(_TRIPS.c.id)
+    if after_id is not None:
+        stmt = stmt.where(_TRIPS.c.id > after_id)
+    result = db.session.execute(stmt, execution_options={"yield_per": batch_size})
+    for rows in result.partitions():
+        yield "".join(_export_line(row, include_blobs) for row in rows)
+
+
+# --- Import ---
+
+def _text(row, key, max_length, required=False):
+    value = row.get(key)
+    if value is None or value == "":
+        if required:
+            raise ValueError(f"{key} is required")
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{key} must be a string")
+    value = value.strip()
+    if required and not value:
+        raise ValueError(f"{key} is required")
+    if len(value) > max_length:
+        raise ValueError(f"{key} is longer than {max_length} characters")
+    return value
+
+
+def _number(value, key, low, high=None):
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{key} must be a number")
+    # json.loads accepts NaN/Infinity (and 1e999 overflows to inf); none of them may reach the stats.
+    if not math.isfinite(value):
+        raise ValueError(f"{key} must be a finite number")
+    if high is None and value < low:
+        raise ValueError(f"{key} must be at least {low}")
+    if high is not None and not low <= value <= high:
+        raise ValueError(f"{key} must be between {low} and {high}")
+    return float(value)
+
+
+def _boolean(value, key):
+    if value is None:
+        return False
+    if not isinstance(value, bool):
+        raise ValueError(f"{key} must be true or false")
+    return value
+
+
+def _date(row, key):
+    try:
+        return date.fromisoformat(row[key])
+    except KeyError:
+        raise ValueError(f"{key} is required")
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} must be a YYYY-MM-DD date")
+
+
+def _json_text(value, key, kind):
+    if value is None:
+        return None
+    if not isinstance(value, kind):
+        raise ValueError(f"{key} must be a JSON {'array' if kind is list else 'object'}")
+    return json.dumps(value)
+
+
+def validate_row(row, user_id, now):
+    """Turns one decoded NDJSON object into trips column values; raises ValueError if it's invalid."""
+    if not isinstance(row, dict):
+        raise ValueError("line must be a JSON object")
+    start_date, end_date = _date(row, "start_date"), _date(row, "end_date")
+    if end_date < start_date:
+        raise ValueError("end_date is before start_date")
+    duration = row.get("duration")
+    if duration is None:
+        duration = (end_date - start_date).days + 1
+    elif isinstance(duration, bool) or not isinstance(duration, int) or duration < 1:
+        raise ValueError("duration must be a positive integer")
+
+    status = row.get("status") or "planned"
+    if status not in STATUS_COLUMNS:
+        raise ValueError(f"status must be one of {', '.join(STATUS_COLUMNS)}")
+    interests = row.get("interests")
+    if interests is not None and not (isinstance(interests, list) and all(isinstance(i, str) for i in interests)):
+        raise ValueError("interests must be a list of strings")
+    budget = row.get("budget") or {}
+    if not isinstance(budget, dict):
+        raise ValueError("budget must be an object")
+
+    created_at = row.get("created_at")
+    if created_at is not None:
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise ValueError("created_at must be an ISO 8601 timestamp")
+
+    return {
+        "user_id": user_id,
+        "title": _text(row, "title", 150, required=True),
+        "destination_city": _text(row, "destination_city", 100, required=True),
+        "destination_country": _text(row, "destination_country", 100, required=True),
+        "latitude": _number(row.get("latitude"), "latitude", -90, 90),
+        "longitude": _number(row.get("longitude"), "longitude", -180, 180),
+        "start_date": start_date,
+        "end_date": end_date,
+        "duration": duration,
+        "status": status,
+        "travel_style": _text(row, "travel_style", 50),
+        "interests": _json_text(interests, "interests", list),
+        "budget_amount": _number(budget.get("amount"), "budget.amount", 0),
+        "budget_currency": _text(budget, "currency", 10) or "USD",
+        "itinerary_data": _json_text(row.get("itinerary"), "itinerary", dict),
+        "weather_data": _json_text(row.get("weather"), "weather", dict),
+        "ai_generated": _boolean(row.get("ai_generated"), "ai_generated"),
+        "generation_model": _text(row, "generation_model", 50),
+        "created_at": created_at or now,
+        "updated_at": now,
+    }
+
+
+def read_lines(stream, max_line=TRIP_IMPORT_MAX_LINE, buffer_size=64 * 1024):
+    """
+    Yields the lines of a raw byte stream (such as request.stream) with bounded memory.
+
+    A line longer than max_line bytes (newline included) is yielded cut to
+    max_line + 1 bytes and the rest of it is skipped.
+    """
+    reader = io.BufferedReader(stream, buffer_size)
+    while True:
+        line = reader.readline(max_line + 1)
+        if not line:
+            return
+        if len(line) > max_line and not line.endswith(b"\n"):
+            rest = line
+            while rest and not rest.endswith(b"\n"):
+                rest = reader.readline(buffer_size)
+        yield line
+
+
+def _start_import(user_id, import_id, offset):
+    job = db.session.get(TripImport, import_id) if import_id else None
+    if job is None:
+        job = TripImport(id=import_id or uuid.uuid4().hex, user_id=user_id)
+        db.session.add(job)
+        db.session.commit()
+    elif job.user_id != int(user_id):
+        raise ImportConflict("import_id is already in use")
+    if offset > job.lines_done:
+        raise ImportConflict(f"Body starts after line {offset} but only lines 1-{job.lines_done} are done")
+    return job
+
+
+def _commit_chunk(import_id, rows, done_before, lines_done, rejected):
+    """Inserts one chunk and advances the import's progress in a single transaction."""
+    if rows:
+        db.session.execute(_TRIPS.insert(), rows)
+        apply_inserted_rows(db.session.connection(), rows)
+    advanced = db.session.execute(
+        _IMPORTS.update()
+        .where(_IMPORTS.c.id == import_id, _IMPORTS.c.lines_done == done_before)
+        .values(lines_done=lines_done, inserted=_IMPORTS.c.inserted + len(rows),
+                rejected=_IMPORTS.c.rejected + rejected, updated_at=datetime.utcnow())
+    ).rowcount
+    if not advanced:
+        db.session.rollback()
+        raise ImportConflict("Another request is running this import")
+    db.session.commit()
+
+
+def import_trips(user_id, lines, import_id=None, offset=0, chunk_size=TRIP_IMPORT_CHUNK_SIZE):
+    """
+    Imports NDJSON trips from `lines` (an iterable of bytes or str) for the user.
+
+    `offset` is the number of lines the client skipped, i.e. the body's first
+    line is line offset + 1; lines up to the import's stored lines_done are
+    skipped. Invalid rows are rejected and counted, not fatal. Returns
+    (TripImport, [{"line", "error"}, ...] for up to TRIP_IMPORT_MAX_ERRORS
+    rejected rows). Raises ImportConflict.
+    """
+    user_id = int(user_id)
+    job = _start_import(user_id, import_id, offset)
+    import_id, done = job.id, job.lines_done
+    now = datetime.utcnow()
+    rows, errors, rejected = [], [], 0
+    line_no = offset
+    for line_no, line in enumerate(lines, offset + 1):
+        if line_no <= done:
+            continue
+        if not line.strip():
+            continue
+        try:
+            if len(line) > TRIP_IMPORT_MAX_LINE:
+                raise ValueError(f"line is longer than {TRIP_IMPORT_MAX_LINE} bytes")
+            try:
+                decoded = json.loads(line)
+            except ValueError:
+                raise ValueError("line is not valid JSON")
+            rows.append(validate_row(decoded, user_id, now))
+        except ValueError as e:
+            rejected += 1
+            if len(errors) < TRIP_IMPORT_MAX_ERRORS:
+                errors.append({"line": line_no, "error": str(e)})
+        if len(rows) >= chunk_size:
+            _commit_chunk(import_id, rows, done, line_no, rejected)
+            rows, rejected, done = [], 0, line_no
+            now = datetime.utcnow()
+
+    if line_no > done:
+        _commit_chunk(import_id, rows, done, line_no, rejected)
+    job = db.session.get(TripImport, import_id)
+    job.status = "completed"
+    db.session.commit()
+    return job, errors
@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import g
+from flask_jwt_extended import get_jwt_identity
+from flask_jwt_extended.config import config as jwt_config
+from sqlalchemy import event, select
+
+from models import db, User
+from utils.metrics import record_cache
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+USER_CACHE_MAXSIZE = int(os.getenv("USER_CACHE_MAXSIZE", 10000))
+
+_USERS = User.__table__
+_COLUMNS = (
+    _USERS.c.id, _USERS.c.email, _USERS.c.username, _USERS.c.travel_style,
+    _USERS.c.interests, _USERS.c.preferred_activities,
+)
+
+
+class UserSnapshot(namedtuple("UserSnapshot", "id email username travel_style interests preferred_activities")):
+    """
+    Read-only view of the profile fields handlers need, with the preference
+    JSON already parsed. Quacks like User for build_generator_inputs.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            id=row.id,
+            email=row.email,
+            username=row.username,
+            travel_style=row.travel_style or "balanced",
+            interests=tuple(json.loads(row.interests)) if row.interests else (),
+            preferred_activities=tuple(json.loads(row.preferred_activities)) if row.preferred_activities else (),
+        )
+
+    def get_interests(self):
+        return list(self.interests)
+
+    def get_preferred_activities(self):
+        return list(self.preferred_activities)
+
+
+class UserCache:
+    """
+    Process-wide TTL + LRU cache of UserSnapshots keyed by user id.
+
+    Profile changes committed through db.session invalidate the entry in this
+    process; other workers see them once their entry expires, so keep the TTL
+    short. Missing users are not cached.
+    """
+    def __init__(self, ttl=USER_CACHE_TTL, maxsize=USER_CACHE_MAXSIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by invalidate(), so a load that raced a profile change is not stored.
+        self._generation = 0
+
+    def get(self, user_id):
+        # JWT identities may arrive as strings; key by the integer primary key.
+        user_id = int(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                record_cache("user", True)
+                return entry[1]
+            generation = self._generation
+        record_cache("user", False)
+
+        row = db.session.execute(select(*_COLUMNS).where(_USERS.c.id == user_id)).first()
+        if row is None:
+            return None
+        snapshot = UserSnapshot.from_row(row)
+        with self._lock:
+            if generation != self._generation:
+                return snapshot
+            self._entries[user_id] = (now + self.ttl, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(int(user_id), None)
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+def load_user(user_id):
+    """Returns the UserSnapshot for `user_id`, or None if there is no such user."""
+    return user_cache.get(user_id)
+
+
+def current_user_snapshot():
+    """
+    The UserSnapshot for the JWT identity of the current request.
+
+    Memoized on flask.g, so a handler and the helpers it calls share one
+    lookup. Must be called inside a @jwt_required() view.
+    """
+    identity = get_jwt_identity()
+    cached = g.get("_user_snapshot")
+    if cached is None or cached[0] != identity:
+        cached = g._user_snapshot = (identity, user_cache.get(identity))
+    return cached[1]
+
+
+def init_jwt(jwt):
+    """Makes flask_jwt_extended.current_user return the cached snapshot."""
+    @jwt.user_lookup_loader
+    def _lookup(_jwt_header, jwt_data):
+        return user_cache.get(jwt_data[jwt_config.identity_claim_key])
+
+
+# --- Invalidation ---
+
+def _after_flush(session, flush_context):
+    changed = {obj.id for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, User)}
+    if changed:
+        session.info.setdefault("user_cache_changed", set()).update(changed)
+
+
+def _after_commit(session):
+    for user_id in session.info.pop("user_cache_changed", ()):
+        user_cache.invalidate(user_id)
+
+
+def _after_rollback(session):
+    session.info.pop("user_cache_changed", None)
+
+
+event.listen(db.session, "after_flush", _after_flush)
+event.listen(db.session, "after_commit", _after_commit)
+event.listen(db.session, "after_rollback", _after_rollback)
@@ -0,0 +1,115 @@
+import os
+import threading
+
+import openmeteo_requests
+import requests
+import requests_cache
+from requests.adapters import HTTPAdapter
+from urllib3 import Retry
+
+from utils.metrics import record_cache, upstream_call
+
+# Overridable so tests and benchmarks can point at a local stub server.
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+
+WEATHER_CACHE_BACKEND = os.getenv("WEATHER_CACHE_BACKEND", "sqlite")  # sqlite | redis | memory
+WEATHER_CACHE_PATH = os.getenv("WEATHER_CACHE_PATH", ".cache")
+WEATHER_CACHE_EXPIRE = int(os.getenv("WEATHER_CACHE_EXPIRE", 3600))
+WEATHER_POOL_SIZE = int(os.getenv("WEATHER_POOL_SIZE", 10))
+WEATHER_RETRIES = int(os.getenv("WEATHER_RETRIES", 5))
+WEATHER_BACKOFF = float(os.getenv("WEATHER_BACKOFF", 0.2))
+WEATHER_TIMEOUT = float(os.getenv("WEATHER_TIMEOUT", 10))
+
+_client = None
+_client_pid = None
+_session = None
+_lock = threading.Lock()
+
+
+def _build_cache_backend():
+    """
+    Returns a requests-cache backend that several gunicorn workers can share.
+
+    SQLite runs in WAL mode with a busy timeout so readers in one worker don't
+    block writers in another; Redis is the option for multi-host deployments.
+    """
+    if WEATHER_CACHE_BACKEND == "redis":
+        import redis
+        return requests_cache.RedisCache(
+            connection=redis.from_url(os.getenv("WEATHER_CACHE_URL", "redis://localhost:6379/0"))
+        )
+    if WEATHER_CACHE_BACKEND == "memory":
+        return "memory"
+    return requests_cache.SQLiteCache(WEATHER_CACHE_PATH, wal=True, busy_timeout=5000)
+
+
+def _build_session():
+    session = requests_cache.CachedSession(
+        backend=_build_cache_backend(), expire_after=WEATHER_CACHE_EXPIRE
+    )
+    retries = Retry(
+        total=WEATHER_RETRIES,
+        backoff_factor=WEATHER_BACKOFF,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=None,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=WEATHER_POOL_SIZE,
+        pool_maxsize=WEATHER_POOL_SIZE,
+        max_retries=retries,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.hooks["response"].append(_record_cache_lookup)
+    return session
+
+
+def _record_cache_lookup(response, *args, **kwargs):
+    # requests-cache can dispatch response hooks twice for a fresh response; count it once.
+    if not getattr(response, "_cache_lookup_recorded", False):
+        response._cache_lookup_recorded = True
+        record_cache("open_meteo", getattr(response, "from_cache", False))
+    return response
+
+
+def get_openmeteo_client():
+    """
+    Returns the process-wide Open-Meteo client, creating it on first use.
+
+    The client is rebuilt after a fork so gunicorn workers never share
+    pooled sockets or SQLite handles inherited from the master process.
+    """
+    global _client, _client_pid, _session
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _lock:
+            if _client is None or _client_pid != pid:
+                _session = _build_session()
+                _client = openmeteo_requests.Client(session=_session)
+                _client_pid = pid
+    return _client
+
+
+def fetch_forecast(params):
+    """Calls the Open-Meteo forecast API through the shared client."""
+    with upstream_call("open_meteo"):
+        return get_openmeteo_client().weather_api(OPEN_METEO_URL, params=params, timeout=WEATHER_TIMEOUT)
+
+
+def cached_forecast_identity(params):
+    """
+    (cache key, fetched-at UTC datetime) of the fresh cached response for `params`, or None.
+
+    Only looks in the cache: nothing is sent upstream, and the response is not
+    decoded. Changes whenever fetch_forecast(params) would return new data.
+    """
+    get_openmeteo_client()
+    # The same request openmeteo_requests sends, so the key matches the one it is cached under.
+    prepared = _session.prepare_request(
+        requests.Request("GET", OPEN_METEO_URL, params={**params, "format": "flatbuffers"})
+    )
+    key = _session.cache.create_key(prepared)
+    cached = _session.cache.get_response(key)
+    if cached is None or cached.is_expired:
+        return None
+    return key, cached.created_at
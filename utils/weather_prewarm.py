@@ -0,0 +1,215 @@
+"""
+Fills in coordinates and weather summaries for upcoming trips ahead of time,
+so trip detail views are served from the database instead of upstream.
+
+Run it from cron (`flask weather prewarm`) or in-process with
+weather_prewarmer.start(app). Each run spends at most `budget` upstream
+requests, nearest trips first; whatever is left over waits for the next run.
+"""
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import bindparam, func, select
+
+from models import db, Trip
+from utils.geocode_cache import geocode_cache
+from weather_routes import (
+    MAX_BATCH_LOCATIONS, WEATHER_FORECAST_DAYS, fetch_coordinates, get_weather_data_many, stored_summary,
+)
+
+WEATHER_PREWARM_BUDGET = int(os.getenv("WEATHER_PREWARM_BUDGET", 20))
+WEATHER_PREWARM_INTERVAL = float(os.getenv("WEATHER_PREWARM_INTERVAL", 900))
+
+# (trip starts within N days, refresh the stored forecast after this long); later trips use the default.
+REFRESH_SCHEDULE = ((1, timedelta(hours=3)), (3, timedelta(hours=6)), (7, timedelta(hours=12)))
+DEFAULT_REFRESH = timedelta(hours=24)
+
+_TRIPS = Trip.__table__
+_FETCHED_AT = func.json_extract(_TRIPS.c.weather_data, "$.fetched_at")
+
+
+def refresh_after(days_until_start):
+    for days, interval in REFRESH_SCHEDULE:
+        if days_until_start <= days:
+            return interval
+    return DEFAULT_REFRESH
+
+
+def _fetched_at(trip):
+    """
+    When a candidate's stored forecast was fetched (naive UTC), or None.
+
+    Stored weather can come from imports, so anything unparseable counts as
+    missing and the trip is simply due for a refresh.
+    """
+    try:
+        if "fetched_at" in trip._fields:
+            fetched_at = trip.fetched_at
+        else:
+            fetched_at = json.loads(trip.weather_data).get("fetched_at") if trip.weather_data else None
+        if fetched_at is None:
+            return None
+        fetched_at = datetime.fromisoformat(fetched_at)
+    except (TypeError, ValueError, AttributeError):
+        return None
+    if fetched_at.tzinfo is not None:
+        fetched_at = fetched_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return fetched_at
+
+
+def _candidates(today):
+    """Trips that overlap the forecast horizon, nearest first."""
+    horizon = today + timedelta(days=WEATHER_FORECAST_DAYS - 1)
+    # json_extract is SQLite's; elsewhere the stored JSON comes back whole and _fetched_at parses it.
+    if db.engine.dialect.name == "sqlite":
+        fetched_at = _FETCHED_AT.label("fetched_at")
+    else:
+        fetched_at = _TRIPS.c.weather_data
+    return db.session.execute(
+        select(
+            _TRIPS.c.id, _TRIPS.c.destination_city, _TRIPS.c.destination_country,
+            _TRIPS.c.latitude, _TRIPS.c.longitude, _TRIPS.c.start_date, _TRIPS.c.duration,
+            fetched_at,
+        )
+        .where(
+            func.coalesce(_TRIPS.c.status, "planned").in_(("planned", "active")),
+            _TRIPS.c.start_date <= horizon,
+            _TRIPS.c.end_date >= today,
+        )
+        .order_by(_TRIPS.c.start_date, _TRIPS.c.id)
+    ).all()
+
+
+def _geocode(trips, budget):
+    """
+    Resolves and stores coordinates for trips without them.
+
+    Each distinct place is looked up once; geocode-cache hits are free, misses
+    cost one request. Returns (coordinates by trip id, requests spent, failures).
+    """
+    coords, places = {}, {}
+    for trip in trips:
+        if trip.latitude is not None and trip.longitude is not None:
+            coords[trip.id] = (trip.latitude, trip.longitude)
+        else:
+            places.setdefault((trip.destination_city, trip.destination_country), []).append(trip.id)
+
+    spent, failed, updates = 0, 0, []
+    for (city, country), trip_ids in places.items():
+        found, place_coords = geocode_cache.get(city, country)
+        if not found:
+            if spent >= budget:
+                continue
+            spent += 1
+            try:
+                place_coords = geocode_cache.get_or_fetch(city, country, fetch_coordinates)
+            except Exception as e:
+                current_app.logger.warning("Geocoding %s, %s failed: %s", city, country, e)
+                failed += len(trip_ids)
+                continue
+        if place_coords is None:
+            failed += len(trip_ids)
+            continue
+        for trip_id in trip_ids:
+            coords[trip_id] = place_coords
+            updates.append({"trip_id": trip_id, "lat": place_coords[0], "lon": place_coords[1]})
+
+    if updates:
+        db.session.execute(
+            _TRIPS.update().where(_TRIPS.c.id == bindparam("trip_id"))
+            .values(latitude=bindparam("lat"), longitude=bindparam("lon")),
+            updates,
+        )
+        db.session.commit()
+    return coords, spent, failed
+
+
+def prewarm_trips(today=None, budget=WEATHER_PREWARM_BUDGET, batch_size=MAX_BATCH_LOCATIONS, now=None):
+    """
+    Geocodes upcoming trips and stores fresh weather summaries for those due.
+
+    A trip is due when it has no stored forecast, or its forecast is older
+    than refresh_after(days until the trip starts), so forecasts are
+    refreshed more often as the trip gets closer and later days of long trips
+    fill in as they enter the horizon. Forecasts are fetched
+    `batch_size` trips per upstream request. Returns counters for the run.
+    """
+    today = today or date.today()
+    now = now or datetime.utcnow()
+    trips = _candidates(today)
+    coords, spent, geocode_failed = _geocode(trips, budget)
+
+    due = []
+    for trip in trips:
+        if trip.id not in coords:
+            continue
+        interval = refresh_after((trip.start_date - today).days)
+        fetched_at = _fetched_at(trip)
+        if fetched_at is None or fetched_at <= now - interval:
+            due.append(trip)
+
+    stored, failed = 0, 0
+    for first in range(0, len(due), batch_size):
+        if spent >= budget:
+            break
+        batch = due[first:first + batch_size]
+        spent += 1
+        try:
+            summaries = get_weather_data_many([
+                (*coords[trip.id], trip.start_date, trip.duration) for trip in batch
+            ], "summary")
+        except Exception as e:
+            current_app.logger.warning("Weather prewarm batch of %d trips failed: %s", len(batch), e)
+            failed += len(batch)
+            continue
+        for trip, summary in zip(batch, summaries):
+            # Through the ORM so set_weather_data's encoding and updated_at stay in one place.
+            db.session.get(Trip, trip.id).set_weather_data(stored_summary(summary))
+        db.session.commit()
+        stored += len(batch)
+
+    return {
+        "candidates": len(trips),
+        "geocoded": sum(1 for trip in trips if trip.latitude is None and trip.id in coords),
+        "geocode_failed": geocode_failed,
+        "forecasts_stored": stored,
+        "forecasts_failed": failed,
+        "deferred": len(due) - stored - failed,
+        "requests": spent,
+    }
+
+
+class WeatherPrewarmer:
+    """Runs prewarm_trips every `interval` seconds in a daemon thread."""
+    def __init__(self, interval=WEATHER_PREWARM_INTERVAL, budget=WEATHER_PREWARM_BUDGET):
+        self.interval = interval
+        self.budget = budget
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self, app):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, args=(app,), name="weather-prewarm", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _loop(self, app):
+        while not self._stopped.is_set():
+            with app.app_context():
+                try:
+                    result = prewarm_trips(budget=self.budget)
+                    app.logger.info("Weather prewarm: %s", result)
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.warning("Weather prewarm failed: %s", e)
+                finally:
+                    db.session.remove()
+            self._stopped.wait(self.interval)
+
+
+weather_prewarmer = WeatherPrewarmer()
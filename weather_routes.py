@@ -1,51 +1,86 @@
+import click
 from flask import Blueprint, request, jsonify
 import requests
-import requests_cache
-from retry_requests import retry
-import openmeteo_requests
+import numpy as np
 import pandas as pd
 import os
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, Trip
+from utils.geocode_cache import geocode_cache
+from utils.http_cache import add_validators, is_not_modified, make_etag, not_modified
+from utils.metrics import propagate, timed, upstream_call
+from utils.weather_client import cached_forecast_identity, fetch_forecast
 
 
 load_dotenv()
 
 weather_bp = Blueprint("weather", __name__)
 GEOCODING_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
+# Lets tests and benchmarks point geocoding at a local stub server.
+GOOGLE_MAPS_API_BASE = os.getenv("GOOGLE_MAPS_API_BASE", "https://maps.googleapis.com")
+MAX_BATCH_LOCATIONS = int(os.getenv("WEATHER_MAX_BATCH_LOCATIONS", 50))
+GEOCODE_WORKERS = 8
+# "compact" (start/interval/values) or "legacy" (one ISO date per value); see get_weather_data.
+WEATHER_PAYLOAD_FORMAT = os.getenv("WEATHER_PAYLOAD_FORMAT", "compact")
+# Open-Meteo returns 7 days unless asked for more (up to 16).
+WEATHER_FORECAST_DAYS = int(os.getenv("WEATHER_FORECAST_DAYS", 7))
+
+# Hourly variables fetched for format=summary, and the daily reductions for each.
+SUMMARY_VARIABLES = {
+    "temperature_2m": ("min", "max", "mean"),
+    "precipitation": ("sum", "max"),
+    "wind_speed_10m": ("max", "mean"),
+}
+_REDUCERS = {"min": np.nanmin, "max": np.nanmax, "mean": np.nanmean, "sum": np.nansum}
 
 def get_coordinates(city, country=None):
     """Fetch latitude & longitude from Google Maps API."""
     if not GEOCODING_API_KEY:
         raise ValueError("GOOGLE_MAPS_API_KEY not set in environment")
 
+    coords = geocode_cache.get_or_fetch(city, country, fetch_coordinates)
+    if coords is None:
+        raise ValueError("City not found: ZERO_RESULTS")
+    return coords
+
+def fetch_coordinates(city, country=None):
+    """
+    Calls the Geocoding API, bypassing the geocode cache (see get_coordinates).
+
+    Returns None only for a definite 'not found'; raises ValueError otherwise.
+    """
+    if not GEOCODING_API_KEY:
+        raise ValueError("GOOGLE_MAPS_API_KEY not set in environment")
     query = f"{city},{country}" if country else city
-    url = f"https://maps.googleapis.com/maps/api/geocode/json?address={query}&key={GEOCODING_API_KEY}"
-    res = requests.get(url).json()
+    url = f"{GOOGLE_MAPS_API_BASE}/maps/api/geocode/json?address={query}&key={GEOCODING_API_KEY}"
+    with upstream_call("geocoding"):
+        res = requests.get(url, timeout=10).json()
 
     if res.get("status") == "OK":
         loc = res["results"][0]["geometry"]["location"]
         return loc["lat"], loc["lng"]
+    elif res.get("status") == "ZERO_RESULTS":
+        return None
     else:
+        # Quota and auth errors are transient, so they must not be cached.
         raise ValueError(f"City not found: {res.get('status')}")
 
-def get_weather_data(lat, lon, start_date=None, duration=3):
-    """Fetch weather data for given lat/lon, optionally by date range."""
-    cache_session = requests_cache.CachedSession(".cache", expire_after=3600)
-    retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
-    openmeteo = openmeteo_requests.Client(session=retry_session)
-
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "hourly": "temperature_2m",
+def _forecast_params(lats, lons, fmt=None):
+    summary = (fmt or WEATHER_PAYLOAD_FORMAT) == "summary"
+    variables = SUMMARY_VARIABLES if summary else ("temperature_2m",)
+    return {
+        "latitude": lats,
+        "longitude": lons,
+        "hourly": ",".join(variables),
         "timezone": "auto",
+        "forecast_days": WEATHER_FORECAST_DAYS,
     }
 
-    responses = openmeteo.weather_api(url, params=params)
-    response = responses[0]
-
+def _hourly_to_dict(response, start_date=None, duration=3):
+    """Converts one Open-Meteo location response into the legacy per-timestamp payload."""
     hourly = response.Hourly()
     hourly_temp = hourly.Variables(0).ValuesAsNumpy()
 
@@ -60,23 +95,328 @@ def get_weather_data(lat, lon, start_date=None, duration=3):
 
     if start_date:
         start_date = pd.to_datetime(start_date)
+        if start_date.tzinfo is None:
+            start_date = start_date.tz_localize("UTC")
         end_date = start_date + timedelta(days=duration)
         mask = (weather_df["date"] >= start_date) & (weather_df["date"] <= end_date)
         weather_df = weather_df.loc[mask]
 
     return weather_df.to_dict(orient="list")
 
+def _hourly_to_compact(response, start_date=None, duration=3):
+    """
+    Converts one Open-Meteo location response into the compact payload.
+
+    Timestamps are implied by `start` (epoch seconds, UTC) and `interval`, so
+    the date-range filter is plain index arithmetic on the numpy buffer.
+    """
+    hourly = response.Hourly()
+    hourly_temp = hourly.Variables(0).ValuesAsNumpy()
+    time_start, interval = hourly.Time(), hourly.Interval()
+
+    first, last = 0, len(hourly_temp)
+    if start_date:
+        start_ts = pd.Timestamp(start_date)
+        if start_ts.tzinfo is None:
+            start_ts = start_ts.tz_localize("UTC")
+        start_ts = int(start_ts.timestamp())
+        end_ts = start_ts + duration * 86400
+        # Same bounds as the legacy mask: start <= t <= end.
+        first = min(max(0, -(-(start_ts - time_start) // interval)), last)
+        last = min(max(first, (end_ts - time_start) // interval + 1), last)
+
+    return {
+        "start": time_start + first * interval,
+        "interval": interval,
+        "utc_offset_seconds": response.UtcOffsetSeconds(),
+        "temperature_2m": np.round(hourly_temp[first:last], 2).tolist(),
+    }
+
+def _hourly_to_summary(response, start_date=None, duration=3):
+    """
+    Reduces the hourly variables in SUMMARY_VARIABLES to per-day statistics.
+
+    Days are calendar days in the location's timezone (Open-Meteo resolves it
+    with timezone=auto). The hourly buffers are NaN-padded to whole local days
+    and reshaped to (variable, day, step) so every reduction is one numpy call.
+    `hours` is the number of hourly samples behind each day, which is less
+    than 24 for the first and last forecast day.
+    """
+    hourly = response.Hourly()
+    interval = hourly.Interval()
+    steps_per_day = 86400 // interval
+    local_start = hourly.Time() + response.UtcOffsetSeconds()
+
+    values = np.stack([
+        hourly.Variables(i).ValuesAsNumpy() for i in range(len(SUMMARY_VARIABLES))
+    ]).astype(np.float64)
+    lead = (local_start % 86400) // interval
+    first_day = local_start // 86400  # Days since the epoch, local calendar.
+    total_days = -(-(lead + values.shape[1]) // steps_per_day)
+
+    padded = np.full((len(values), total_days * steps_per_day), np.nan)
+    padded[:, lead:lead + values.shape[1]] = values
+    days = padded.reshape(len(values), total_days, steps_per_day)
+
+    first, last = 0, total_days
+    if start_date:
+        start_day = int(np.datetime64(pd.Timestamp(start_date).date(), "D").astype(np.int64))
+        first = min(max(0, start_day - first_day), total_days)
+        last = min(first + duration, total_days)
+    days = days[:, first:last]
+
+    summary = {
+        "dates": np.arange(first_day + first, first_day + last).astype("datetime64[D]").astype(str).tolist(),
+        "hours": np.sum(~np.isnan(days[0]), axis=1).tolist(),
+    }
+    for index, (variable, reductions) in enumerate(SUMMARY_VARIABLES.items()):
+        summary[variable] = {
+            name: np.round(_REDUCERS[name](days[index], axis=1), 2).tolist() for name in reductions
+        }
+    return summary
+
+def _hourly_to_payload(response, start_date=None, duration=3, fmt=None):
+    fmt = fmt or WEATHER_PAYLOAD_FORMAT
+    with timed("transform"):
+        if fmt == "summary":
+            return _hourly_to_summary(response, start_date, duration)
+        if fmt == "legacy":
+            return _hourly_to_dict(response, start_date, duration)
+        return _hourly_to_compact(response, start_date, duration)
+
+def get_weather_data(lat, lon, start_date=None, duration=3, fmt=None):
+    """
+    Fetch weather data for given lat/lon, optionally by date range.
+
+    `fmt` is "compact" (default), "legacy" for the per-timestamp lists, or
+    "summary" for daily statistics (see _hourly_to_summary).
+    """
+    responses = fetch_forecast(_forecast_params(lat, lon, fmt))
+    return _hourly_to_payload(responses[0], start_date, duration, fmt)
+
+def get_weather_data_many(locations, fmt=None):
+    """
+    Fetch weather for many locations with a single Open-Meteo request.
+
+    `locations` is a list of (lat, lon, start_date, duration) tuples. Results are
+    returned in the same order; identical coordinates are only requested once.
+    """
+    unique_coords = list(dict.fromkeys((lat, lon) for lat, lon, _, _ in locations))
+    if not unique_coords:
+        return []
+
+    responses = fetch_forecast(_forecast_params(
+        [lat for lat, _ in unique_coords],
+        [lon for _, lon in unique_coords],
+        fmt,
+    ))
+    by_coords = dict(zip(unique_coords, responses))
+
+    return [
+        _hourly_to_payload(by_coords[(lat, lon)], start_date, duration, fmt)
+        for lat, lon, start_date, duration in locations
+    ]
+
+# Forecast hours start on a multiple of 15 minutes past the UTC hour in every timezone, so the
+# hours selected from "now" on (and hence the /forecast body) only change at these boundaries.
+FORECAST_WINDOW_SECONDS = 900
+
+def _forecast_validators(identity, city, fmt, window):
+    """ETag and Last-Modified for a /forecast body: the cached upstream response plus the time window."""
+    key, fetched_at = identity
+    window_start = datetime.utcfromtimestamp(window * FORECAST_WINDOW_SECONDS)
+    return make_etag("forecast", key, fetched_at, city, fmt, window), max(fetched_at.replace(tzinfo=None), window_start)
+
 @weather_bp.route("/forecast", methods=["GET"])
 def forecast():
+    """
+    Hourly forecast for the next 3 days in `city`.
+
+    The weak ETag is derived from the identity of the cached Open-Meteo
+    response, so a client polling with If-None-Match (or If-Modified-Since)
+    gets a 304 without the forecast being decoded, transformed or serialized.
+    """
     city = request.args.get("city")
     if not city:
         return jsonify({"error": "City query param is required"}), 400
+    fmt = request.args.get("format")
     try:
         lat, lon = get_coordinates(city)
-        weather = get_weather_data(lat, lon, datetime.utcnow(), 3)
-        return jsonify({"city": city, "data": weather})
+        now = datetime.utcnow()
+        window = int(now.replace(tzinfo=timezone.utc).timestamp()) // FORECAST_WINDOW_SECONDS
+        params = _forecast_params(lat, lon, fmt)
+        identity = cached_forecast_identity(params)
+        if identity is not None:
+            etag, last_modified = _forecast_validators(identity, city, fmt, window)
+            if is_not_modified(etag, last_modified):
+                return not_modified(etag, last_modified)
+
+        weather = _hourly_to_payload(fetch_forecast(params)[0], now, 3, fmt)
+        response = jsonify({"city": city, "data": weather})
+        identity = identity or cached_forecast_identity(params)
+        if identity is not None:
+            add_validators(response, *_forecast_validators(identity, city, fmt, window))
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@weather_bp.route("/forecast/batch", methods=["POST"])
+@jwt_required(optional=True)
+def forecast_batch():
+    """
+    Forecasts for many cities and/or trips in one call.
+
+    Body: {"cities": ["Paris", {"city": "Tokyo", "country": "Japan"}], "trip_ids": [1, 2],
+           "format": "compact" | "legacy" | "summary", "store": false}
+    Trips use their stored coordinates and are sliced to their own dates; looking
+    up trips requires a JWT. Failures are reported per location. With
+    format=summary and store=true, trip summaries are saved to Trip.weather_data.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Body must be a JSON object"}), 400
+    cities = data.get("cities") or []
+    trip_ids = data.get("trip_ids") or []
+
+    if not isinstance(cities, list) or not isinstance(trip_ids, list):
+        return jsonify({"error": "cities and trip_ids must be lists"}), 400
+    if not cities and not trip_ids:
+        return jsonify({"error": "cities or trip_ids is required"}), 400
+    if len(cities) + len(trip_ids) > MAX_BATCH_LOCATIONS:
+        return jsonify({"error": f"At most {MAX_BATCH_LOCATIONS} locations per batch"}), 400
+    # bool is an int subclass, but true/false are not trip ids.
+    if any(isinstance(trip_id, bool) or not isinstance(trip_id, int) for trip_id in trip_ids):
+        return jsonify({"error": "Each trip id must be an integer"}), 400
+
+    results = {"cities": {}, "trips": {}}
+    locations = []
+
+    for item in cities:
+        city, country = (item.get("city"), item.get("country")) if isinstance(item, dict) else (item, None)
+        if not city or not isinstance(city, str) or not isinstance(country, (str, type(None))):
+            return jsonify({"error": "Each city must be a name or an object with string city/country"}), 400
+        locations.append({
+            "bucket": "cities", "key": f"{city},{country}" if country else city,
+            "city": city, "country": country, "lat": None, "lon": None,
+            "start_date": datetime.utcnow(), "duration": 3,
+        })
+
+    if trip_ids:
+        user_id = get_jwt_identity()
+        if user_id is None:
+            return jsonify({"error": "Authentication required for trip_ids"}), 401
+        trips = Trip.query.filter(Trip.user_id == user_id, Trip.id.in_(trip_ids)).all()
+        for trip in trips:
+            locations.append({
+                "bucket": "trips", "key": str(trip.id),
+                "city": trip.destination_city, "country": trip.destination_country,
+                "lat": trip.latitude, "lon": trip.longitude,
+                "start_date": trip.start_date, "duration": trip.duration,
+            })
+        found = {str(trip.id) for trip in trips}
+        for trip_id in trip_ids:
+            if str(trip_id) not in found:
+                results["trips"][str(trip_id)] = {"error": "Trip not found"}
+
+    # Geocode everything without stored coordinates through the shared cache.
+    to_geocode = [loc for loc in locations if loc["lat"] is None or loc["lon"] is None]
+    with ThreadPoolExecutor(max_workers=GEOCODE_WORKERS) as pool:
+        geocoded = list(pool.map(
+            propagate(lambda loc: _try_get_coordinates(loc["city"], loc["country"])), to_geocode
+        ))
+    for loc, (coords, error) in zip(to_geocode, geocoded):
+        if error:
+            loc["error"] = error
+        else:
+            loc["lat"], loc["lon"] = coords
+
+    resolved = []
+    for loc in locations:
+        if "error" in loc:
+            results[loc["bucket"]][loc["key"]] = {"error": loc["error"]}
+        else:
+            resolved.append(loc)
+
+    try:
+        weather = get_weather_data_many([
+            (loc["lat"], loc["lon"], loc["start_date"], loc["duration"]) for loc in resolved
+        ], data.get("format"))
     except Exception as e:
+        for loc in resolved:
+            results[loc["bucket"]][loc["key"]] = {"error": str(e)}
+        return jsonify({"results": results}), 502
+
+    store = data.get("store") and data.get("format") == "summary"
+    trips_by_id = {str(trip.id): trip for trip in trips} if trip_ids else {}
+    for loc, payload in zip(resolved, weather):
+        results[loc["bucket"]][loc["key"]] = {
+            "city": loc["city"],
+            "country": loc["country"],
+            "latitude": loc["lat"],
+            "longitude": loc["lon"],
+            "data": payload,
+        }
+        if store and loc["bucket"] == "trips":
+            trips_by_id[loc["key"]].set_weather_data(stored_summary(payload))
+    if store:
+        db.session.commit()
+
+    return jsonify({"results": results})
+
+def stored_summary(summary):
+    """Wraps a format=summary payload the way it is kept in Trip.weather_data."""
+    return {"format": "summary", "fetched_at": datetime.utcnow().isoformat(), "data": summary}
+
+def store_trip_weather_summary(trip):
+    """
+    Fetches the daily summary for the trip's dates and saves it in Trip.weather_data.
+
+    Trip detail views then read the stored summary via Trip.to_dict and never
+    call upstream. The caller commits.
+    """
+    if trip.latitude is not None and trip.longitude is not None:
+        lat, lon = trip.latitude, trip.longitude
+    else:
+        lat, lon = get_coordinates(trip.destination_city, trip.destination_country)
+    summary = get_weather_data(lat, lon, trip.start_date, trip.duration, "summary")
+    trip.set_weather_data(stored_summary(summary))
+    return summary
+
+@weather_bp.route("/forecast/trips/<int:trip_id>/summary", methods=["POST"])
+@jwt_required()
+def store_trip_summary(trip_id):
+    trip = Trip.query.filter_by(id=trip_id, user_id=get_jwt_identity()).first()
+    if not trip:
+        return jsonify({"error": "Trip not found"}), 404
+    try:
+        summary = store_trip_weather_summary(trip)
+        db.session.commit()
+        return jsonify({"trip_id": trip.id, "data": summary})
+    except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+def _try_get_coordinates(city, country):
+    try:
+        return get_coordinates(city, country), None
+    except Exception as e:
+        return None, str(e)
+
+
+@weather_bp.cli.command("prewarm")
+@click.option("--budget", type=int, default=None, help="Maximum upstream requests for this run.")
+def prewarm_command(budget):
+    """Geocode upcoming trips and store fresh weather summaries for them."""
+    # Imported here: utils.weather_prewarm builds on this module.
+    from utils.weather_prewarm import WEATHER_PREWARM_BUDGET, prewarm_trips
+
+    print(prewarm_trips(budget=WEATHER_PREWARM_BUDGET if budget is None else budget))
+
 
-__all__ = ["get_coordinates", "get_weather_data", "weather_bp"]
+__all__ = [
+    "get_coordinates",
+    "get_weather_data",
+    "get_weather_data_many",
+    "store_trip_weather_summary",
+    "weather_bp",
+]